@@ -0,0 +1,94 @@
+"""
+Maintained document counts for the dashboards.
+
+One document per counter in the `counters` collection:
+    {"_id": "jobposts", "count": 120}              collection total
+    {"_id": "jobposts:<userId>", "count": 7}       per-HR total
+
+Writers call increment() next to each insert (and with -1 next to each
+delete); reconcile() recomputes every counter from the collections to
+correct any drift. To reconcile by hand:
+
+    python counters.py
+"""
+import os
+from datetime import datetime
+from pymongo import UpdateOne
+
+
+COUNTER_RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", "3600"))
+
+# Counted collection -> the field holding the owning HR user's id (None: total only)
+COUNTED = {
+    "hrs": None,
+    "jobposts": "created_by",
+    "candidates": "userId",
+}
+
+
+def counter_id(name, userId=None):
+    return f"{name}:{userId}" if userId else name
+
+
+class Counters:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def increment(self, name, userId=None, amount=1):
+        """
+        Atomically add `amount` to the collection total and, with `userId`, to
+        that user's total.
+        """
+        ids = [counter_id(name)] + ([counter_id(name, userId)] if userId else [])
+        self.collection.bulk_write([
+            UpdateOne({"_id": _id}, {"$inc": {"count": amount}}, upsert=True)
+            for _id in ids
+        ], ordered=False)
+
+    def get(self, names, userId=None):
+        """
+        {name: count} for the given counters, from one indexed lookup.
+        """
+        ids = {counter_id(name, userId): name for name in names}
+        counts = {name: 0 for name in names}
+        for doc in self.collection.find({"_id": {"$in": list(ids)}}):
+            counts[ids[doc["_id"]]] = doc["count"]
+        return counts
+
+    def reconcile(self, db):
+        """
+        Recompute every counter from the collections; returns the counters that had drifted.
+        """
+        now = datetime.utcnow()
+        actual = {}
+        for name, owner_field in COUNTED.items():
+            actual[counter_id(name)] = db[name].count_documents({})
+            if owner_field:
+                for row in db[name].aggregate([{"$group": {"_id": f"${owner_field}", "count": {"$sum": 1}}}]):
+                    if row["_id"]:
+                        actual[counter_id(name, str(row["_id"]))] = row["count"]
+
+        stored = {doc["_id"]: doc.get("count", 0) for doc in self.collection.find({}, {"count": 1})}
+        drifted = {
+            _id: {"stored": stored.get(_id, 0), "actual": actual.get(_id, 0)}
+            for _id in set(stored) | set(actual)
+            if stored.get(_id, 0) != actual.get(_id, 0)
+        }
+        if drifted:
+            self.collection.bulk_write([
+                UpdateOne({"_id": _id}, {"$set": {"count": counts["actual"], "reconciled_at": now}}, upsert=True)
+                for _id, counts in drifted.items()
+            ], ordered=False)
+        return drifted
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"))["hr_management_system"]
+    drifted = Counters(db["counters"]).reconcile(db)
+    print(f"✅ Reconciled counters, {len(drifted)} had drifted.")
+    for _id, counts in sorted(drifted.items()):
+        print(f"   {_id}: {counts['stored']} -> {counts['actual']}")
@@ -0,0 +1,115 @@
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+
+
+CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "256"))
+# Refresh access tokens this many seconds before they expire
+CREDENTIAL_REFRESH_MARGIN = int(os.getenv("CREDENTIAL_REFRESH_MARGIN", "300"))
+# Built services kept per user, one per (api, version, thread), least recently used dropped first
+SERVICE_CACHE_SIZE = int(os.getenv("SERVICE_CACHE_SIZE", "8"))
+
+
+class CredentialsNotFound(Exception):
+    """No stored Google credentials for the user."""
+
+
+class CredentialStore:
+    """
+    In-process LRU cache of each user's Google Credentials and built API
+    service objects, backed by the `tickle/{userId}.pickle` files.
+
+    Tokens are refreshed shortly before they expire and the refreshed token is
+    written back to disk. Built services are kept per thread because the
+    underlying httplib2 transport is not thread-safe, at most
+    `services_per_user` of them per user.
+    """
+
+    def __init__(self, base_dir, maxsize=CREDENTIAL_CACHE_SIZE, refresh_margin=CREDENTIAL_REFRESH_MARGIN,
+                 services_per_user=SERVICE_CACHE_SIZE):
+        self.base_dir = base_dir
+        self.maxsize = maxsize
+        self.services_per_user = services_per_user
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._entries = OrderedDict()  # userId -> {"creds", "services", "lock"}
+        self._lock = threading.Lock()
+
+    def _path(self, userId):
+        return self.base_dir / f"{userId}.pickle"
+
+    def _entry(self, userId):
+        with self._lock:
+            entry = self._entries.get(userId)
+            if entry is not None:
+                self._entries.move_to_end(userId)
+                return entry
+
+            entry = {"creds": None, "services": OrderedDict(), "lock": threading.Lock()}
+            self._entries[userId] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            return entry
+
+    def _needs_refresh(self, creds):
+        if not creds.valid:
+            return True
+        # google-auth keeps `expiry` as naive UTC
+        return creds.expiry is not None and creds.expiry - datetime.utcnow() <= self.refresh_margin
+
+    def get_credentials(self, userId):
+        entry = self._entry(userId)
+        with entry["lock"]:
+            creds = entry["creds"]
+            if creds is None:
+                path = self._path(userId)
+                if not path.exists():
+                    raise CredentialsNotFound(userId)
+                with open(path, "rb") as token:
+                    creds = pickle.load(token)
+                entry["creds"] = creds
+
+            if creds and creds.refresh_token and self._needs_refresh(creds):
+                creds.refresh(Request())
+                self._persist(userId, creds)
+
+            return creds
+
+    def get_service(self, userId, api, version):
+        """
+        Return a built `api`/`version` service for the user, cached per thread.
+        Use it on the calling thread only.
+        """
+        creds = self.get_credentials(userId)
+        entry = self._entry(userId)
+        key = (api, version, threading.get_ident())
+        with entry["lock"]:
+            services = entry["services"]
+            service = services.get(key)
+            if service is not None:
+                services.move_to_end(key)
+                return service
+            service = build(api, version, credentials=creds, cache_discovery=False)
+            services[key] = service
+            while len(services) > self.services_per_user:
+                services.popitem(last=False)
+            return service
+
+    def save(self, userId, creds):
+        """
+        Store new credentials (after the OAuth flow), replacing any cached ones.
+        """
+        self._persist(userId, creds)
+        with self._lock:
+            self._entries.pop(userId, None)
+
+    def _persist(self, userId, creds):
+        # Write then rename so a concurrent reader never sees a half-written pickle
+        path = self._path(userId)
+        tmp_path = path.with_suffix(".pickle.tmp")
+        with open(tmp_path, "wb") as token_file:
+            pickle.dump(creds, token_file)
+        os.replace(tmp_path, path)
@@ -0,0 +1,120 @@
+import os
+import json
+import httpx
+
+from key_pool import GeminiKeyPool, parse_retry_after
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+# Pool / timeout settings (seconds), overridable from .env
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", "10"))
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_MAX_KEEPALIVE = int(os.getenv("GEMINI_MAX_KEEPALIVE", "10"))
+GEMINI_KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "30"))
+
+# Extra attempts (each on the least-loaded available key) after a 429
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+
+
+class GeminiError(Exception):
+    """Gemini returned an error status or a response we could not parse."""
+
+
+_client = None
+
+key_pool = GeminiKeyPool.from_file()
+
+
+def get_client():
+    """
+    Return the shared pooled HTTP client, creating it on first use.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED,
+            timeout=httpx.Timeout(GEMINI_TIMEOUT, connect=GEMINI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONNECTIONS,
+                max_keepalive_connections=GEMINI_MAX_KEEPALIVE,
+                keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+            ),
+            headers={"Content-Type": "application/json"},
+        )
+    return _client
+
+
+async def close_client():
+    """
+    Close the shared client (called on application shutdown).
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def parse_generated_json(response_json):
+    """
+    Pull the generated text out of a generateContent response, strip the
+    markdown code fences and decode it as JSON.
+    """
+    try:
+        generated_text = response_json["candidates"][0]["content"]["parts"][0]["text"]
+    except (KeyError, IndexError, TypeError):
+        raise GeminiError("Gemini response is empty")
+
+    generated_text = generated_text.replace("```json", "").replace("```", "").strip()
+    if not generated_text:
+        raise GeminiError("Gemini response is empty")
+
+    try:
+        return json.loads(generated_text)
+    except json.JSONDecodeError as e:
+        raise GeminiError(f"Invalid JSON from Gemini: {e}")
+
+
+async def generate_json(prompt, api_key=None, model=GEMINI_MODEL):
+    """
+    Send a single-prompt generateContent request and return the parsed JSON.
+    The request goes through the key pool: a shared `api_key` (or none) is
+    routed to the least-loaded shared key, and a 429 is retried on another
+    key after the throttled one is put on cooldown.
+    """
+    url = f"{GEMINI_BASE_URL}/{model}:generateContent"
+    data = {"contents": [{"parts": [{"text": prompt}]}]}
+
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        try:
+            key = await key_pool.acquire(api_key)
+        except ValueError as e:
+            raise GeminiError(str(e))
+        response = None
+        try:
+            response = await get_client().post(url, params={"key": key}, json=data)
+        except httpx.HTTPError as e:
+            raise GeminiError(f"Gemini request failed: {e}")
+        finally:
+            # Also on cancellation, so the key's in_flight count never leaks
+            if response is None:
+                key_pool.release(key)
+
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        delay = key_pool.release(key, response.status_code, retry_after)
+        if response.status_code != 429 or attempt == GEMINI_MAX_RETRIES:
+            break
+        print(f"⚠️ Gemini key rate limited, cooling down for {delay:.1f}s (attempt {attempt + 1})")
+
+    if response.status_code != 200:
+        raise GeminiError(f"Gemini API Error {response.status_code}: {response.text}")
+
+    return parse_generated_json(response.json())
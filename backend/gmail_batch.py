@@ -0,0 +1,127 @@
+import os
+import time
+import base64
+
+
+# Gmail accepts up to 100 calls per batch but recommends staying at or below 50
+GMAIL_BATCH_SIZE = int(os.getenv("GMAIL_BATCH_SIZE", "50"))
+# Failed calls of a batch (mostly per-call rate limiting) are retried this many times
+GMAIL_BATCH_RETRIES = int(os.getenv("GMAIL_BATCH_RETRIES", "3"))
+GMAIL_BATCH_BACKOFF = float(os.getenv("GMAIL_BATCH_BACKOFF", "1"))
+
+
+def _status(exception):
+    resp = getattr(exception, "resp", None)
+    return getattr(resp, "status", None)
+
+
+def batch_execute(service, requests_, kind, stats):
+    """
+    Run `requests_` (a list of googleapiclient HttpRequest objects) through the
+    Gmail batch endpoint, GMAIL_BATCH_SIZE at a time. Calls that fail are
+    retried in a new batch with exponential backoff, up to GMAIL_BATCH_RETRIES
+    times; a 404 (message or attachment deleted meanwhile) is not retried.
+
+    Returns (responses, failed): responses in the same order (None for calls
+    that failed), and the indexes of the calls that still failed with an error
+    other than 404.
+    Appends one {"kind", "size", "ms"} entry per batch to `stats`.
+    """
+    results = [None] * len(requests_)
+    errors = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            errors[int(request_id)] = exception
+            return
+        results[int(request_id)] = response
+
+    pending = list(range(len(requests_)))
+    for attempt in range(GMAIL_BATCH_RETRIES + 1):
+        if attempt:
+            time.sleep(GMAIL_BATCH_BACKOFF * 2 ** (attempt - 1))
+            print(f"Retrying {len(pending)} failed Gmail batch {kind} calls (attempt {attempt + 1})")
+        errors.clear()
+
+        for start in range(0, len(pending), GMAIL_BATCH_SIZE):
+            chunk = pending[start:start + GMAIL_BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=callback)
+            for index in chunk:
+                batch.add(requests_[index], request_id=str(index))
+
+            began = time.perf_counter()
+            batch.execute()
+            stats.append({
+                "kind": kind,
+                "size": len(chunk),
+                "ms": round((time.perf_counter() - began) * 1000, 1),
+            })
+
+        pending = sorted(index for index, error in errors.items() if _status(error) != 404)
+        if not pending:
+            break
+
+    for index in pending:
+        print(f"Gmail batch {kind} call {index} failed: {errors[index]}")
+    return results, pending
+
+
+def iter_parts(payload):
+    """
+    Walk a message payload depth-first, including nested multipart bodies.
+    """
+    for part in payload.get("parts", []):
+        yield part
+        yield from iter_parts(part)
+
+
+def is_pdf_part(part):
+    filename = part.get("filename", "")
+    return filename.lower().endswith(".pdf") or part.get("mimeType") == "application/pdf"
+
+
+def fetch_messages(service, message_ids, stats):
+    """
+    Fetch full message resources for `message_ids` in batches.
+    Returns ({message_id: message} for the calls that succeeded, [message ids that failed]).
+    """
+    requests_ = [service.users().messages().get(userId="me", id=message_id) for message_id in message_ids]
+    responses, failed = batch_execute(service, requests_, "messages", stats)
+    messages = {
+        message_id: response
+        for message_id, response in zip(message_ids, responses)
+        if response is not None
+    }
+    return messages, [message_ids[index] for index in failed]
+
+
+def fetch_pdf_attachments(service, messages, stats):
+    """
+    Download only the PDF parts of `messages` ({message_id: message}) in batches.
+    Small PDFs that Gmail inlines in the part body are decoded without a call.
+    Returns ({message_id: [pdf_bytes, ...]}, {message ids with an attachment that failed}).
+    """
+    pdfs = {message_id: [] for message_id in messages}
+    pending = []
+
+    for message_id, message in messages.items():
+        for part in iter_parts(message.get("payload", {})):
+            if not is_pdf_part(part):
+                continue
+            body = part.get("body", {})
+            if "attachmentId" in body:
+                pending.append((message_id, body["attachmentId"]))
+            elif body.get("data"):
+                pdfs[message_id].append(base64.urlsafe_b64decode(body["data"]))
+
+    requests_ = [
+        service.users().messages().attachments().get(userId="me", messageId=message_id, id=attachment_id)
+        for message_id, attachment_id in pending
+    ]
+    responses, failed = batch_execute(service, requests_, "attachments", stats)
+
+    for (message_id, _), response in zip(pending, responses):
+        if response is not None:
+            pdfs[message_id].append(base64.urlsafe_b64decode(response["data"]))
+
+    return pdfs, {pending[index][0] for index in failed}
@@ -0,0 +1,149 @@
+import os
+from datetime import datetime, timedelta, timezone
+from googleapiclient.errors import HttpError
+
+
+# How far back the very first (full) sync of a mailbox looks
+GMAIL_INITIAL_SYNC_HOURS = int(os.getenv("GMAIL_INITIAL_SYNC_HOURS", "24"))
+GMAIL_PAGE_SIZE = int(os.getenv("GMAIL_PAGE_SIZE", "100"))
+# Polls that retry a message Gmail failed to return before it is given up on
+GMAIL_MAX_RETRIES = int(os.getenv("GMAIL_MAX_RETRIES", "5"))
+
+
+class GmailSync:
+    """
+    Per-HR incremental Gmail sync backed by a Mongo cursor collection.
+
+    Each user has one document:
+        {"_id": userId, "history_id": "...", "synced_at": datetime,
+         "retry_ids": {"<message id>": attempts},
+         "last_poll": {"mode": "history" | "full", "api_calls": 3, "messages": 2, "retried": 0, "at": datetime}}
+
+    `poll` returns the ids of messages added since the stored checkpoint using
+    the history API. When there is no checkpoint yet, or Gmail reports it as
+    expired (404), it falls back to a paginated `messages.list` full sync.
+    The caller persists the new checkpoint with `commit` once the messages are
+    safely processed, so a crash mid-cycle re-delivers them on the next poll.
+    Messages that could not be fetched are recorded with `mark_failed` and
+    returned again by the next polls, so they never hold the checkpoint back.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def poll(self, service, userId):
+        """
+        Returns (message_ids, checkpoint). `checkpoint` is passed to `commit`.
+        """
+        cursor = self.collection.find_one({"_id": userId}) or {}
+        calls = 0
+        mode = "history"
+        message_ids = None
+
+        if cursor.get("history_id"):
+            try:
+                message_ids, history_id, calls = self._history_sync(service, cursor["history_id"])
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                print(f"History checkpoint expired for user {userId}, running full sync")
+                calls += 1
+
+        if message_ids is None:
+            mode = "full"
+            since = cursor.get("synced_at") or datetime.utcnow() - timedelta(hours=GMAIL_INITIAL_SYNC_HOURS)
+            message_ids, history_id, full_calls = self._full_sync(service, since)
+            calls += full_calls
+
+        # ✅ Messages that failed on an earlier poll are fetched again
+        retries = [message_id for message_id in cursor.get("retry_ids") or {} if message_id not in message_ids]
+        message_ids = message_ids + retries
+
+        checkpoint = {
+            "history_id": history_id,
+            "synced_at": datetime.utcnow(),
+            "retry_ids": {},
+            "last_poll": {
+                "mode": mode,
+                "api_calls": calls,
+                "messages": len(message_ids),
+                "retried": len(retries),
+                "at": datetime.utcnow(),
+            },
+        }
+        return message_ids, checkpoint
+
+    def mark_failed(self, userId, checkpoint, message_ids):
+        """
+        Record `message_ids` in `checkpoint` for the next poll to fetch again.
+        A message is dropped after failing GMAIL_MAX_RETRIES polls in a row.
+        """
+        cursor = self.collection.find_one({"_id": userId}, {"retry_ids": 1}) or {}
+        attempts = cursor.get("retry_ids") or {}
+        for message_id in message_ids:
+            count = attempts.get(message_id, 0) + 1
+            if count >= GMAIL_MAX_RETRIES:
+                print(f"Giving up on Gmail message {message_id} of user {userId} after {count} failed polls")
+                continue
+            checkpoint["retry_ids"][message_id] = count
+
+    def commit(self, userId, checkpoint):
+        self.collection.update_one({"_id": userId}, {"$set": checkpoint}, upsert=True)
+
+    def get_cursor(self, userId):
+        return self.collection.find_one({"_id": userId})
+
+    def _history_sync(self, service, start_history_id):
+        message_ids = []
+        seen = set()
+        calls = 0
+        page_token = None
+        history_id = start_history_id
+
+        while True:
+            response = service.users().history().list(
+                userId="me",
+                startHistoryId=start_history_id,
+                historyTypes=["messageAdded"],
+                labelId="INBOX",
+                maxResults=GMAIL_PAGE_SIZE,
+                pageToken=page_token,
+            ).execute()
+            calls += 1
+
+            for record in response.get("history", []):
+                for added in record.get("messagesAdded", []):
+                    message_id = added["message"]["id"]
+                    if message_id not in seen:
+                        seen.add(message_id)
+                        message_ids.append(message_id)
+
+            history_id = response.get("historyId", history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        return message_ids, history_id, calls
+
+    def _full_sync(self, service, since):
+        # Take the checkpoint before listing so nothing that arrives meanwhile is skipped
+        profile = service.users().getProfile(userId="me").execute()
+        calls = 1
+
+        # Mongo hands back naive UTC datetimes
+        query = f"in:inbox after:{int(since.replace(tzinfo=timezone.utc).timestamp())}"
+        message_ids = []
+        page_token = None
+
+        while True:
+            response = service.users().messages().list(
+                userId="me", q=query, maxResults=GMAIL_PAGE_SIZE, pageToken=page_token
+            ).execute()
+            calls += 1
+
+            message_ids.extend(msg["id"] for msg in response.get("messages", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        return message_ids, profile["historyId"], calls
@@ -0,0 +1,154 @@
+"""
+Declarative index registry for the hot collections, plus a query-plan check.
+
+Indexes are applied idempotently at startup (`ensure_indexes`). To inspect
+the plans of the hot queries from the command line:
+
+    python indexes.py
+"""
+import os
+from datetime import datetime
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+# collection name -> indexes it must have
+INDEXES = {
+    "hrs": [
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "jobposts": [
+        # Serves both the created_by filter and keyset pagination on _id
+        IndexModel([("created_by", ASCENDING), ("_id", ASCENDING)], name="created_by_id"),
+    ],
+    "candidates": [
+        IndexModel([("candidate.candidate.jobpost_id", ASCENDING), ("_id", ASCENDING)], name="jobpost_id_id"),
+        IndexModel([("ingest_key", ASCENDING)], unique=True, name="ingest_key_unique",
+                   partialFilterExpression={"ingest_key": {"$exists": True}}),
+        # Faceted candidate search
+        IndexModel([("userId", ASCENDING), ("facets.skill_ids", ASCENDING)], name="userId_skill_ids"),
+        IndexModel([("userId", ASCENDING), ("facets.location", ASCENDING)], name="userId_location"),
+        IndexModel([("userId", ASCENDING), ("facets.experience_years", ASCENDING)], name="userId_experience_years"),
+    ],
+    "pdf_matches": [
+        IndexModel([("userId", ASCENDING)], name="userId"),
+        IndexModel([("ingest_key", ASCENDING)], unique=True, name="ingest_key_unique",
+                   partialFilterExpression={"ingest_key": {"$exists": True}}),
+    ],
+    "screening": [
+        IndexModel([("candidate_id", ASCENDING)], name="candidate_id"),
+    ],
+    "ranking": [
+        IndexModel([("userId", ASCENDING), ("job_post_id", ASCENDING)], name="userId_job_post_id"),
+    ],
+    "candidate_scores": [
+        IndexModel([("job_post_id", ASCENDING), ("job_hash", ASCENDING)], name="job_post_id_job_hash"),
+    ],
+    "slots": [
+        # Available slots paged in (start_time, _id) order
+        IndexModel([("userId", ASCENDING), ("available", ASCENDING), ("start_time", ASCENDING), ("_id", ASCENDING)],
+                   name="userId_available_start_time_id"),
+        # Loading an interviewer's upcoming slots into the slot index
+        IndexModel([("userId", ASCENDING), ("end_time", ASCENDING)], name="userId_end_time"),
+    ],
+    "ingest_queue": [
+        IndexModel([("state", ASCENDING), ("next_attempt_at", ASCENDING)], name="state_next_attempt_at"),
+        IndexModel([("userId", ASCENDING), ("state", ASCENDING)], name="userId_state"),
+    ],
+}
+
+# Indexes superseded by one above, dropped by ensure_indexes
+DROPPED_INDEXES = {
+    "slots": ["userId_available_start_time"],
+}
+
+# (collection, endpoints that run it, sample filter[, sort]) for the query-plan report
+HOT_QUERIES = [
+    ("hrs", "signup, signin, google-auth", {"email": "hr@example.com"}),
+    ("jobposts", "home, get-posts, resume matching", {"created_by": "000000000000000000000000"}),
+    ("candidates", "get-candidates, ranking", {"candidate.candidate.jobpost_id": "000000000000000000000000"}),
+    ("candidates", "search-candidates", {"userId": "000000000000000000000000", "facets.skill_ids": {"$all": ["python"]}}),
+    ("screening", "screening", {"candidate_id": "000000000000000000000000"}),
+    ("ranking", "ranking", {"userId": "000000000000000000000000", "job_post_id": "000000000000000000000000"}),
+    ("candidate_scores", "ranking", {"job_post_id": "000000000000000000000000", "job_hash": "0" * 64}),
+    ("slots", "available-slots", {"userId": "000000000000000000000000", "available": True,
+                                  "start_time": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 1, 15)}},
+     [("start_time", 1), ("_id", 1)]),
+    ("slots", "book-slot", {"userId": "000000000000000000000000", "available": True,
+                            "start_time": datetime(2025, 1, 1, 10)}),
+    ("slots", "slot index load", {"userId": "000000000000000000000000", "end_time": {"$gt": datetime(2025, 1, 1)}}),
+    ("ingest_queue", "ingest workers", {"state": {"$in": ["fetched", "extracted", "matched"]},
+                                        "next_attempt_at": {"$lte": datetime(2025, 1, 1)}}),
+]
+
+
+def ensure_indexes(db):
+    """
+    Create every registered index. Existing identical indexes are a no-op;
+    an index that cannot be built (e.g. duplicates under a unique key) is
+    reported and skipped so startup still succeeds.
+    """
+    for collection_name, models in INDEXES.items():
+        for model in models:
+            try:
+                db[collection_name].create_indexes([model])
+            except OperationFailure as e:
+                print(f"⚠️ Could not create index {model.document['name']} on {collection_name}: {e}")
+    for collection_name, names in DROPPED_INDEXES.items():
+        existing = db[collection_name].index_information()
+        for name in names:
+            if name in existing:
+                db[collection_name].drop_index(name)
+
+
+def _plan_stages(plan):
+    """
+    Collect (stage, indexName) pairs from a winning plan, whatever its nesting.
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append((plan["stage"], plan.get("indexName")))
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+def explain_hot_queries(db):
+    """
+    Run explain() on every hot query and report whether its winning plan uses an index.
+    """
+    report = []
+    for collection_name, used_by, query, *sort in HOT_QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort[0])
+        plan = cursor.explain()
+        stages = _plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+        indexes = sorted({index for _, index in stages if index})
+        report.append({
+            "collection": collection_name,
+            "used_by": used_by,
+            "query": str(query),
+            "stages": [stage for stage, _ in stages],
+            "indexes": indexes,
+            "uses_index": bool(indexes),
+            "collection_scan": any(stage == "COLLSCAN" for stage, _ in stages),
+            "in_memory_sort": any(stage == "SORT" for stage, _ in stages),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"))["hr_management_system"]
+    ensure_indexes(db)
+    for row in explain_hot_queries(db):
+        status = "✅ index" if row["uses_index"] else "❌ COLLSCAN"
+        print(f"{status:12} {row['collection']:13} {row['query']}  [{', '.join(row['indexes'])}]  ({row['used_by']})")
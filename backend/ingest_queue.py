@@ -0,0 +1,246 @@
+import os
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from bson import Binary
+from pymongo import ReturnDocument
+
+
+FETCHED = "fetched"
+EXTRACTED = "extracted"
+MATCHED = "matched"
+STORED = "stored"
+DEAD = "dead"
+ACTIVE_STATES = [FETCHED, EXTRACTED, MATCHED]
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_LEASE_SECONDS = int(os.getenv("INGEST_LEASE_SECONDS", "300"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "5"))
+INGEST_BACKOFF_SECONDS = int(os.getenv("INGEST_BACKOFF_SECONDS", "30"))
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "5"))
+
+
+class PermanentError(Exception):
+    """
+    A failure that retrying cannot fix (e.g. an unreadable PDF): the item goes
+    straight to the `dead` state instead of being retried with backoff.
+    """
+
+
+class IngestQueue:
+    """
+    Durable Mongo-backed work queue for incoming resumes.
+
+    One item per (HR user, source id), where the source id is the Gmail
+    message id or the hash of an uploaded PDF:
+        {"_id": "<userId>:<source>:<source_id>", "userId", "source", "state",
+         "attempts", "next_attempt_at", "lease_until", "lease_owner",
+         "last_error", "sender", "subject", "batch", "pdf_bytes" | "pdf_hash", "candidate"}
+
+    Items move fetched -> extracted -> matched -> stored. A worker claims an
+    item by taking a time-limited lease, so a crashed worker's item becomes
+    claimable again once the lease runs out. Failures are retried with
+    exponential backoff and end in the `dead` state after INGEST_MAX_ATTEMPTS
+    (or at once for a PermanentError).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def enqueue(self, userId, source, source_id, pdf_bytes, sender, subject, batch=False, lease_owner=None,
+                retry_dead=False):
+        """
+        Add an item in the `fetched` state. Re-enqueueing the same source is a no-op,
+        except that with `retry_dead` a dead item starts over from `fetched`.
+        `batch` lets the item be matched in a multi-resume Gemini request.
+        With `lease_owner`, a new item is inserted already leased to that owner,
+        so the background workers cannot claim it first (see get_leased).
+        Returns the item key.
+        """
+        key = f"{userId}:{source}:{source_id}"
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=INGEST_LEASE_SECONDS) if lease_owner else None
+        if retry_dead:
+            self.collection.update_one(
+                {"_id": key, "state": DEAD},
+                {
+                    "$set": {
+                        "sender": sender,
+                        "subject": subject,
+                        "pdf_bytes": Binary(pdf_bytes),
+                        "batch": batch,
+                        "state": FETCHED,
+                        "attempts": 1 if lease_owner else 0,
+                        "next_attempt_at": now,
+                        "lease_until": lease_until,
+                        "lease_owner": lease_owner,
+                        "last_error": None,
+                        "updated_at": now,
+                    },
+                    "$unset": {"pdf_hash": "", "candidate": ""},
+                },
+            )
+        self.collection.update_one(
+            {"_id": key},
+            {"$setOnInsert": {
+                "userId": userId,
+                "source": source,
+                "source_id": source_id,
+                "sender": sender,
+                "subject": subject,
+                "pdf_bytes": Binary(pdf_bytes),
+                "batch": batch,
+                "state": FETCHED,
+                "attempts": 1 if lease_owner else 0,
+                "next_attempt_at": now,
+                "lease_until": lease_until,
+                "lease_owner": lease_owner,
+                "last_error": None,
+                "created_at": now,
+                "updated_at": now,
+            }},
+            upsert=True,
+        )
+        return key
+
+    def claim(self, lease_owner, key=None):
+        """
+        Lease the next due item (or the item `key`) to `lease_owner`, a token
+        unique to this claim. Returns the item (carrying the token) or None.
+        """
+        now = datetime.utcnow()
+        query = {
+            "state": {"$in": ACTIVE_STATES},
+            "next_attempt_at": {"$lte": now},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lte": now}}],
+        }
+        if key is not None:
+            query["_id"] = key
+
+        return self.collection.find_one_and_update(
+            query,
+            {
+                "$set": {"lease_until": now + timedelta(seconds=INGEST_LEASE_SECONDS), "lease_owner": lease_owner},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def advance(self, item, state, fields=None, unset=None):
+        """
+        Move a leased item to `state`. Returns False if the lease was lost.
+        """
+        update = {"$set": {"state": state, "updated_at": datetime.utcnow(), **(fields or {})}}
+        if unset:
+            update["$unset"] = {field: "" for field in unset}
+        if state not in ACTIVE_STATES:
+            update["$set"].update({"lease_until": None, "lease_owner": None})
+
+        result = self.collection.update_one({"_id": item["_id"], "lease_owner": item["lease_owner"]}, update)
+        if result.modified_count:
+            item.update(update["$set"])
+            for field in unset or []:
+                item.pop(field, None)
+            return True
+        return False
+
+    def fail(self, item, error, retry=True):
+        """
+        Release the lease and schedule a retry, or dead-letter the item
+        (right away when `retry` is False).
+        """
+        now = datetime.utcnow()
+        fields = {"last_error": error, "lease_until": None, "lease_owner": None, "updated_at": now}
+        if not retry or item["attempts"] >= INGEST_MAX_ATTEMPTS:
+            fields["state"] = DEAD
+        else:
+            fields["next_attempt_at"] = now + timedelta(seconds=INGEST_BACKOFF_SECONDS * 2 ** (item["attempts"] - 1))
+
+        self.collection.update_one({"_id": item["_id"], "lease_owner": item["lease_owner"]}, {"$set": fields})
+        item.update(fields)
+
+    def get(self, key):
+        return self.collection.find_one({"_id": key}, {"pdf_bytes": 0})
+
+    def get_leased(self, key, lease_owner):
+        """
+        The item if it is (still) leased to `lease_owner`, else None.
+        """
+        return self.collection.find_one({"_id": key, "lease_owner": lease_owner})
+
+    def get_stats(self, userId=None):
+        pipeline = [{"$match": {"userId": userId}}] if userId else []
+        pipeline.append({"$group": {"_id": "$state", "count": {"$sum": 1}}})
+        counts = {state: 0 for state in ACTIVE_STATES + [STORED, DEAD]}
+        for row in self.collection.aggregate(pipeline):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+
+class IngestWorker:
+    """
+    Drives claimed items through `steps`, a mapping of state to an async
+    function `step(item) -> (next_state, fields, unset)`.
+    """
+
+    def __init__(self, queue, steps):
+        self.queue = queue
+        self.steps = steps
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+
+    async def process(self, item):
+        try:
+            while item["state"] in self.steps:
+                next_state, fields, unset = await self.steps[item["state"]](item)
+                if not await asyncio.to_thread(self.queue.advance, item, next_state, fields, unset):
+                    print(f"Lost lease on ingest item {item['_id']}")
+                    return item
+        except Exception as e:
+            print(f"Ingest item {item['_id']} failed in state {item['state']}: {e}")
+            await asyncio.to_thread(self.queue.fail, item, str(e), not isinstance(e, PermanentError))
+        return item
+
+    def new_lease_owner(self):
+        """
+        A lease owner token for one claim (or inline enqueue + process_key call).
+        The run_forever tasks of a worker share its worker_id, so each claim
+        gets its own token: otherwise one task could advance or fail an item
+        that another task has re-claimed after its lease ran out.
+        """
+        return f"{self.worker_id}-{uuid.uuid4().hex[:8]}"
+
+    async def process_key(self, key, lease_owner=None):
+        """
+        Process one specific item right away: the item enqueued with
+        `lease_owner`, or else the item claimed now. If it cannot be claimed
+        (already done, leased elsewhere or backing off) the current stored
+        item is returned instead.
+        """
+        if lease_owner:
+            item = await asyncio.to_thread(self.queue.get_leased, key, lease_owner)
+            if item is not None:
+                return await self.process(item)
+        item = await asyncio.to_thread(self.queue.claim, self.new_lease_owner(), key)
+        if item is None:
+            return await asyncio.to_thread(self.queue.get, key)
+        return await self.process(item)
+
+    async def run_forever(self):
+        while not self._stopping.is_set():
+            try:
+                item = await asyncio.to_thread(self.queue.claim, self.new_lease_owner())
+                if item is not None:
+                    await self.process(item)
+                    continue
+            except Exception as e:
+                # e.g. MongoDB unreachable: keep the worker alive and retry after a pause
+                print(f"Ingest worker {self.worker_id} failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=INGEST_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self):
+        self._stopping.set()
@@ -0,0 +1,26 @@
+"""
+Run ingestion queue workers without serving the API, so resume processing
+can be scaled separately:
+
+    INGEST_WORKERS=4 python ingest_worker.py
+
+Start the API with INGEST_WORKERS=0 to leave all queue work to these processes.
+"""
+import asyncio
+from main import ingest_worker
+from gemini_client import close_client
+from ingest_queue import INGEST_WORKERS
+
+
+async def run():
+    try:
+        await asyncio.gather(*(ingest_worker.run_forever() for _ in range(max(INGEST_WORKERS, 1))))
+    finally:
+        await close_client()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("⏹️ Ingest workers stopped.")
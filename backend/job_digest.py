@@ -0,0 +1,135 @@
+"""
+Compact per-job-post digests for the resume-matching prompt.
+
+The matching prompt only needs enough of each job post to tell which one a
+resume applies to, so instead of the whole document (ObjectIds and the
+generated `online_job_platform` / `facebook_linkedin` / `details` bodies) it
+gets a digest stored on the job post:
+
+    "digest": {"id": "...", "title": "...", "category": "...", "location": "...",
+               "type": "...", "skills": ["python", "react"], "summary": "..."}
+
+The digest is rebuilt whenever the post is written, and lazily for posts
+created before digests existed.
+"""
+import os
+import json
+import math
+import threading
+from bson import ObjectId
+
+from skill_index import extract_skills
+
+
+DIGEST_SUMMARY_CHARS = int(os.getenv("DIGEST_SUMMARY_CHARS", "300"))
+
+# Rough size of a Gemini token in characters; good enough to compare prompt sizes
+CHARS_PER_TOKEN = 4
+
+DIGEST_PROJECTION = {"digest": 1, "digest_tokens": 1, "raw_tokens": 1}
+DIGEST_EXCLUDED = {"digest": 0, "digest_tokens": 0, "raw_tokens": 0}
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _flatten(value):
+    if isinstance(value, dict):
+        return " ".join(_flatten(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def build_digest(job_post):
+    description = " ".join(str(job_post.get("job_description") or "").split())
+    if len(description) > DIGEST_SUMMARY_CHARS:
+        description = description[:DIGEST_SUMMARY_CHARS].rsplit(" ", 1)[0] + "..."
+
+    requirements_text = " ".join([
+        str(job_post.get("job_title") or ""),
+        str(job_post.get("job_description") or ""),
+        _flatten(job_post.get("details")),
+    ])
+    digest = {
+        "id": str(job_post["_id"]),
+        "title": job_post.get("job_title"),
+        "category": job_post.get("job_category"),
+        "location": job_post.get("job_location"),
+        "type": job_post.get("job_type"),
+        "skills": extract_skills(requirements_text),
+        "summary": description,
+    }
+    return {key: value for key, value in digest.items() if value not in (None, "", [])}
+
+
+def digest_fields(job_post):
+    """
+    The fields stored on the job post: the digest and the prompt size of the
+    digest vs. the raw document it replaces.
+    """
+    digest = build_digest(job_post)
+    return {
+        "digest": digest,
+        "digest_tokens": estimate_tokens(json.dumps(digest)),
+        "raw_tokens": estimate_tokens(str(job_post)),
+    }
+
+
+class JobDigests:
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.Lock()
+        self.stats = {"prompts": 0, "tokens_before": 0, "tokens_after": 0, "rebuilt": 0,
+                      "selection": {"exact": 0, "top_k": 0, "all": 0, "batch": 0}}
+
+    def refresh(self, job_post_id):
+        """
+        Rebuild the digest of one job post; call after every write to the post.
+        """
+        job_post = self.collection.find_one({"_id": ObjectId(job_post_id)}, DIGEST_EXCLUDED)
+        if not job_post:
+            return None
+        fields = digest_fields(job_post)
+        self.collection.update_one({"_id": job_post["_id"]}, {"$set": fields})
+        with self._lock:
+            self.stats["rebuilt"] += 1
+        return fields
+
+    def for_user(self, userId):
+        """
+        The digests of all the user's job posts and the estimated prompt tokens
+        of the digests vs. the raw job posts.
+        """
+        digests = []
+        raw_tokens = 0
+        digest_tokens = 0
+        for job_post in self.collection.find({"created_by": userId}, DIGEST_PROJECTION).sort("_id", 1):
+            fields = job_post if "digest" in job_post else self.refresh(job_post["_id"])
+            if not fields:
+                continue
+            digests.append(fields["digest"])
+            raw_tokens += fields.get("raw_tokens", 0)
+            digest_tokens += fields.get("digest_tokens", 0)
+        return digests, raw_tokens, digest_tokens
+
+    def record(self, tokens_before, tokens_after, selection="all"):
+        """
+        Count one matching prompt: its estimated size with all raw job posts vs.
+        as sent, and how its job posts were selected (see job_selector).
+        """
+        with self._lock:
+            self.stats["prompts"] += 1
+            self.stats["selection"][selection] += 1
+            self.stats["tokens_before"] += tokens_before
+            self.stats["tokens_after"] += tokens_after
+
+    def get_stats(self):
+        with self._lock:
+            stats = {**self.stats, "selection": dict(self.stats["selection"])}
+        prompts = stats["prompts"]
+        stats["avg_tokens_before"] = round(stats["tokens_before"] / prompts, 1) if prompts else 0.0
+        stats["avg_tokens_after"] = round(stats["tokens_after"] / prompts, 1) if prompts else 0.0
+        stats["reduction"] = round(1 - stats["tokens_after"] / stats["tokens_before"], 4) if stats["tokens_before"] else 0.0
+        return stats
@@ -0,0 +1,128 @@
+import os
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+
+from job_digest import DIGEST_EXCLUDED
+
+
+PENDING = "pending"
+GENERATING = "generating"
+READY = "ready"
+FAILED = "failed"
+TERMINAL_STATES = [READY, FAILED]
+
+JOBPOST_GENERATION_CONCURRENCY = int(os.getenv("JOBPOST_GENERATION_CONCURRENCY", "2"))
+
+
+class JobPostGenerator:
+    """
+    Runs `generate(jobpost, api_key, job_post_id)` for new job posts in the
+    background and tracks its progress on the job post itself:
+        {"generation_status": "pending" | "generating" | "ready" | "failed",
+         "generation_error": "...", "generation_updated_at": ...}
+
+    Posts left pending or generating by a stopped server are picked up again
+    by resume_unfinished() at startup. `on_change(created_by)`, if given, is
+    called after every status change.
+    """
+
+    def __init__(self, collection, generate, concurrency=JOBPOST_GENERATION_CONCURRENCY, on_change=None):
+        self.collection = collection
+        self.generate = generate
+        self.concurrency = concurrency
+        self.on_change = on_change
+        self._semaphore = None
+        self._tasks = {}
+        self._events = {}
+
+    def _set_status(self, job_post_id, status, error=None):
+        self.collection.update_one(
+            {"_id": ObjectId(job_post_id)},
+            {"$set": {"generation_status": status, "generation_error": error,
+                      "generation_updated_at": datetime.utcnow()}},
+        )
+
+    async def _update(self, job_post_id, jobpost, status, error=None):
+        await asyncio.to_thread(self._set_status, job_post_id, status, error)
+        if self.on_change:
+            self.on_change(jobpost.get("created_by"))
+
+    def submit(self, job_post_id, jobpost, api_key):
+        """
+        Start generating a job post that was saved with `generation_status: pending`.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if job_post_id in self._tasks:
+            return
+        self._events[job_post_id] = asyncio.Event()
+        task = asyncio.create_task(self._run(job_post_id, jobpost, api_key))
+        self._tasks[job_post_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_post_id, None))
+
+    async def _run(self, job_post_id, jobpost, api_key):
+        try:
+            async with self._semaphore:
+                await self._update(job_post_id, jobpost, GENERATING)
+                try:
+                    await self.generate(jobpost, api_key, job_post_id)
+                except Exception as e:
+                    print(f"Job post {job_post_id} generation failed: {e}")
+                    await self._update(job_post_id, jobpost, FAILED, str(e))
+                else:
+                    await self._update(job_post_id, jobpost, READY)
+        finally:
+            event = self._events.pop(job_post_id, None)
+            if event:
+                event.set()
+
+    async def resume_unfinished(self, get_api_key):
+        """
+        Re-submit posts whose generation did not finish; returns how many.
+        """
+        posts = await asyncio.to_thread(
+            lambda: list(self.collection.find({"generation_status": {"$in": [PENDING, GENERATING]}}, DIGEST_EXCLUDED))
+        )
+        for post in posts:
+            api_key = await asyncio.to_thread(get_api_key, post.get("created_by"))
+            self.submit(str(post["_id"]), post, api_key)
+        return len(posts)
+
+    async def wait(self, job_post_id, timeout):
+        """
+        Wait until the post's generation finishes in this process, or `timeout` seconds.
+        """
+        event = self._events.get(job_post_id)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def get_status(self, job_post_id):
+        post = self.collection.find_one(
+            {"_id": ObjectId(job_post_id)},
+            {"created_by": 1, "generation_status": 1, "generation_error": 1, "generation_updated_at": 1},
+        )
+        if not post:
+            return None
+        return {
+            "job_post_id": job_post_id,
+            "created_by": post.get("created_by"),
+            # Posts created before background generation have no status
+            "generation_status": post.get("generation_status", READY),
+            "generation_error": post.get("generation_error"),
+            "updated_at": post.get("generation_updated_at"),
+        }
+
+    async def stop(self):
+        """
+        Cancel running generations; they stay pending/generating and resume at next startup.
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,183 @@
+"""
+Local job-post selection in front of the resume-matching prompt.
+
+Scores the resume text and email subject against each job-post digest with
+BM25 and keeps the top `MATCH_TOP_K` posts for Gemini. When the subject names
+exactly one job title, that post is selected outright.
+
+Accuracy and latency on a synthetic corpus:
+
+    python job_selector.py [--posts 50] [--resumes 500] [--top-k 5]
+"""
+import os
+import time
+import random
+import argparse
+import numpy as np
+
+from prescore import tokenize, bm25_scores
+
+
+MATCH_TOP_K = int(os.getenv("MATCH_TOP_K", "5"))
+
+# The title says most about which post a resume is for
+TITLE_WEIGHT = 3
+
+
+def _normalize(text):
+    return " ".join(tokenize(str(text or "")))
+
+
+def exact_title_match(digests, subject):
+    """
+    The digest whose job title appears in the subject as whole words. When
+    several titles appear the longest wins ("Senior Python Developer" over
+    "Python Developer"). None if there is no match, or if any other post's
+    title also contains the matched one (a shared title, or "Python Developer"
+    in the subject while a "Senior Python Developer" post is open).
+    """
+    subject = f" {_normalize(subject)} "
+    titles = [f" {_normalize(digest.get('title'))} " for digest in digests]
+    best, best_title = None, None
+    for digest, title in zip(digests, titles):
+        if title.strip() and title in subject and (best_title is None or len(title) > len(best_title)):
+            best, best_title = digest, title
+    if best is None or sum(best_title in title for title in titles) > 1:
+        return None
+    return best
+
+
+def digest_tokens(digest):
+    text = " ".join([
+        (str(digest.get("title") or "") + " ") * TITLE_WEIGHT,
+        str(digest.get("category") or ""),
+        " ".join(digest.get("skills") or []),
+        str(digest.get("summary") or ""),
+    ])
+    return tokenize(text)
+
+
+def rank_job_posts(digests, resume_text, subject):
+    """
+    Digests ordered by BM25 similarity to the resume and subject, best first.
+    """
+    query = tokenize(f"{subject or ''} {resume_text or ''}")
+    if not digests or not query:
+        return list(digests)
+    scores, _, _ = bm25_scores(query, [digest_tokens(digest) for digest in digests])
+    return [digests[i] for i in np.argsort(-scores, kind="stable")]
+
+
+def select_job_posts(digests, resume_text, subject, top_k=MATCH_TOP_K):
+    """
+    Returns (selected digests, how they were selected): "exact" when the
+    subject names a single post, "top_k" when the list was narrowed, "all"
+    when there were no more than `top_k` posts to begin with.
+    """
+    exact = exact_title_match(digests, subject)
+    if exact:
+        return [exact], "exact"
+    if len(digests) <= top_k:
+        return list(digests), "all"
+    return rank_job_posts(digests, resume_text, subject)[:top_k], "top_k"
+
+
+# 📌 Synthetic benchmark
+ROLES = {
+    "Python Developer": ["python", "django", "flask", "postgresql", "rest api", "docker"],
+    "Frontend Engineer": ["javascript", "react", "typescript", "css", "html", "redux"],
+    "Data Scientist": ["python", "pandas", "machine learning", "tensorflow", "statistics", "sql"],
+    "DevOps Engineer": ["kubernetes", "docker", "aws", "terraform", "ci/cd", "linux"],
+    "Android Developer": ["kotlin", "java", "android", "firebase", "jetpack compose", "gradle"],
+    "iOS Developer": ["swift", "ios", "xcode", "objective-c", "core data", "swiftui"],
+    "QA Engineer": ["selenium", "test automation", "cypress", "jira", "api testing", "python"],
+    "Product Designer": ["figma", "ux research", "prototyping", "design systems", "sketch", "user testing"],
+    "Data Engineer": ["spark", "airflow", "kafka", "sql", "python", "etl"],
+    "Backend Engineer": ["go", "microservices", "grpc", "postgresql", "redis", "kafka"],
+    "Accountant": ["bookkeeping", "tally", "excel", "tax", "auditing", "financial reporting"],
+    "HR Executive": ["recruitment", "payroll", "onboarding", "employee relations", "hris", "labor law"],
+    "Digital Marketer": ["seo", "google ads", "content marketing", "social media", "analytics", "email campaigns"],
+    "Sales Executive": ["b2b sales", "crm", "negotiation", "lead generation", "salesforce", "cold calling"],
+}
+LEVELS = ["Junior", "Senior", "Lead", "Principal", ""]
+FILLER = ("team player motivated communication problem solving detail oriented fast learner "
+          "collaborative university bachelor degree project experience responsible").split()
+
+
+def synthetic_corpus(n_posts, n_resumes, seed=7):
+    rng = random.Random(seed)
+    digests = []
+    for i in range(n_posts):
+        role = rng.choice(list(ROLES))
+        title = f"{rng.choice(LEVELS)} {role}".strip()
+        skills = rng.sample(ROLES[role], 4)
+        digests.append({
+            "id": f"post{i}",
+            "title": title,
+            "skills": skills,
+            "summary": f"We are hiring a {title.lower()} experienced in {', '.join(skills)}.",
+            "_role": role,
+        })
+
+    resumes = []
+    for _ in range(n_resumes):
+        post = rng.choice(digests)
+        skills = rng.sample(ROLES[post["_role"]], 3) + rng.sample(rng.choice(list(ROLES.values())), 1)
+        words = skills + rng.sample(FILLER, 6)
+        rng.shuffle(words)
+        subject = rng.choice([
+            f"Application for {post['title']}",   # names the post
+            f"Applying for the {post['_role']} role",  # names the role, maybe not the level
+            "My resume",                          # says nothing
+            "cv_final.pdf",
+        ])
+        resumes.append((post, subject, " ".join(words)))
+    return digests, resumes
+
+
+def benchmark(n_posts=50, n_resumes=500, top_k=MATCH_TOP_K):
+    digests, resumes = synthetic_corpus(n_posts, n_resumes)
+    ids_by_title = {}
+    for digest in digests:
+        ids_by_title.setdefault(digest["title"], set()).add(digest["id"])
+
+    counts = {"exact": 0, "top_k": 0, "all": 0}
+    exact_correct = 0
+    recalled = 0
+    timings = []
+    for post, subject, resume_text in resumes:
+        start = time.perf_counter()
+        selected, how = select_job_posts(digests, resume_text, subject, top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        counts[how] += 1
+        selected_ids = {digest["id"] for digest in selected}
+        # Posts sharing the true post's title are indistinguishable in this corpus
+        if selected_ids & ids_by_title[post["title"]]:
+            recalled += 1
+            if how == "exact":
+                exact_correct += 1
+
+    timings = np.array(timings)
+    return {
+        "posts": n_posts,
+        "resumes": n_resumes,
+        "top_k": top_k,
+        "selection": counts,
+        "recall": round(recalled / n_resumes, 4),
+        "exact_precision": round(exact_correct / counts["exact"], 4) if counts["exact"] else None,
+        "posts_per_prompt": round((counts["exact"] + (counts["top_k"] + counts["all"]) * min(top_k, n_posts)) / n_resumes, 2),
+        "latency_ms_p50": round(float(np.percentile(timings, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(timings, 95)), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Job-post selection accuracy on a synthetic corpus")
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=MATCH_TOP_K)
+    args = parser.parse_args()
+
+    for key, value in benchmark(args.posts, args.resumes, args.top_k).items():
+        print(f"{key}: {value}")
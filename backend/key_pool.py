@@ -0,0 +1,178 @@
+"""
+Pool of Gemini API keys with a token bucket per key.
+
+Every request takes a token from the least-loaded key that has one. A 429
+puts the key on cooldown for its Retry-After (or an exponential backoff when
+the header is missing) so the next attempt goes to another key.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+
+GEMINI_KEYS_FILE = os.getenv("GEMINI_KEYS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gemini_key.json"))
+GEMINI_KEY_RPM = float(os.getenv("GEMINI_KEY_RPM", "15"))
+GEMINI_KEY_BURST = float(os.getenv("GEMINI_KEY_BURST", "5"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "2"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "60"))
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def mask_key(key):
+    return f"...{key[-4:]}" if len(key) > 4 else "..."
+
+
+class KeyState:
+    def __init__(self, key, rate, capacity):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_throttles = 0
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0}
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """
+        Seconds until this key can take a request.
+        """
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class GeminiKeyPool:
+    """
+    Shared keys (from gemini_key.json) serve any request. A key that is not in
+    the file, e.g. one an HR user brought themselves, is dedicated: it gets its
+    own bucket and is only used for that user's requests.
+
+    Only used from the event loop: choosing a key and taking its token
+    happen without an await in between, so no lock is needed.
+    """
+
+    def __init__(self, keys, rpm=GEMINI_KEY_RPM, burst=GEMINI_KEY_BURST):
+        self.rate = rpm / 60.0
+        self.burst = burst
+        self.states = {}
+        for key in keys:
+            if key and key not in self.states:
+                self.states[key] = KeyState(key, self.rate, self.burst)
+        self.dedicated = {}
+        self.waits = 0
+
+    @classmethod
+    def from_file(cls, path=GEMINI_KEYS_FILE):
+        try:
+            with open(path) as f:
+                keys = json.load(f)
+        except FileNotFoundError:
+            print(f"⚠️ {path} not found, the Gemini key pool is empty.")
+            keys = {}
+        return cls(keys.values() if isinstance(keys, dict) else keys)
+
+    def assign_key(self):
+        """
+        A key to store on a new HR user (the least-loaded one, random among ties).
+        """
+        if not self.states:
+            return ""
+        states = list(self.states.values())
+        random.shuffle(states)
+        return min(states, key=lambda state: state.stats["requests"] + state.in_flight).key
+
+    def _candidates(self, api_key):
+        if api_key and api_key not in self.states:
+            if api_key not in self.dedicated:
+                self.dedicated[api_key] = KeyState(api_key, self.rate, self.burst)
+            return [self.dedicated[api_key]]
+        return list(self.states.values())
+
+    async def acquire(self, api_key=None):
+        """
+        Wait for a token and return the key to use; pair with release().
+        `api_key` is the caller's own key: a shared key means any shared key
+        will do, a dedicated key is always used as is.
+        """
+        states = self._candidates(api_key)
+        if not states:
+            raise ValueError("No Gemini API key configured")
+        while True:
+            now = time.monotonic()
+            for state in states:
+                state.refill(now)
+            ready = [state for state in states if state.wait_time(now) == 0]
+            if ready:
+                state = min(ready, key=lambda s: (s.in_flight, -s.tokens))
+                state.tokens -= 1
+                state.in_flight += 1
+                state.stats["requests"] += 1
+                return state.key
+            self.waits += 1
+            await asyncio.sleep(min(state.wait_time(now) for state in states))
+
+    def release(self, key, status=None, retry_after=None):
+        """
+        Return the key after a request. A 429 starts a cooldown from Retry-After,
+        or an exponential backoff when the header is missing.
+        """
+        state = self.states.get(key) or self.dedicated[key]
+        state.in_flight -= 1
+        if status == 429:
+            state.consecutive_throttles += 1
+            state.stats["throttled"] += 1
+            backoff = min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** (state.consecutive_throttles - 1))
+            delay = retry_after if retry_after is not None else backoff
+            state.cooldown_until = time.monotonic() + delay
+            state.tokens = 0
+            return delay
+        if status is None or status >= 400:
+            state.stats["errors"] += 1
+        else:
+            state.consecutive_throttles = 0
+        return 0.0
+
+    def get_stats(self):
+        now = time.monotonic()
+        keys = []
+        for state in list(self.states.values()) + list(self.dedicated.values()):
+            state.refill(now)
+            keys.append({
+                "key": mask_key(state.key),
+                "shared": state.key in self.states,
+                **state.stats,
+                "in_flight": state.in_flight,
+                "tokens": round(state.tokens, 2),
+                "cooldown_seconds": round(max(0.0, state.cooldown_until - now), 1),
+            })
+        return {"keys": keys, "rpm_per_key": round(self.rate * 60, 2), "burst": self.burst, "waits": self.waits}
@@ -0,0 +1,103 @@
+"""
+Concurrent load test against a running API, e.g. to compare the async
+handlers with the threadpool-bound sync ones:
+
+    python load_benchmark.py http://localhost:8000/get-candidate/<userId>/<candidateId> -n 2000 -c 200
+
+Reports throughput and latency percentiles for the given concurrency.
+
+Without a running API and database, --simulate serves two in-process
+endpoints that each spend --db-latency-ms on one database round trip: a
+sync handler that blocks a threadpool thread (pymongo) and an async one that
+awaits (Motor). The comparison shows the concurrency gain on its own:
+
+    python load_benchmark.py --simulate -n 2000 -c 10 50 200
+"""
+import time
+import asyncio
+import argparse
+import httpx
+import numpy as np
+
+
+def simulated_app(db_latency):
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_handler():
+        time.sleep(db_latency)  # blocking driver call, holds a threadpool thread
+        return {}
+
+    @app.get("/async")
+    async def async_handler():
+        await asyncio.sleep(db_latency)  # awaited driver call, frees the event loop
+        return {}
+
+    return app
+
+
+async def run(url, total, concurrency, app=None):
+    latencies = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    transport = httpx.ASGITransport(app=app) if app else None
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency),
+                                 transport=transport, base_url="http://simulated") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                began = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append((time.perf_counter() - began) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        began = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - began
+
+    latencies = np.array(latencies)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_per_second": round(total / elapsed, 1),
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 1),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 1),
+        "latency_ms_p99": round(float(np.percentile(latencies, 99)), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent GET load test")
+    parser.add_argument("url", nargs="?")
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--simulate", action="store_true", help="compare in-process sync and async handlers")
+    parser.add_argument("--db-latency-ms", type=float, default=20)
+    args = parser.parse_args()
+    if not args.simulate and not args.url:
+        parser.error("a url is required without --simulate")
+
+    if args.simulate:
+        app = simulated_app(args.db_latency_ms / 1000)
+        print(f"{'handler':<8}{'concurrency':>12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for concurrency in args.concurrency:
+            for handler in ("/sync", "/async"):
+                result = asyncio.run(run(handler, args.requests, concurrency, app))
+                print(f"{handler[1:]:<8}{concurrency:>12}{result['requests_per_second']:>10}"
+                      f"{result['latency_ms_p50']:>10}{result['latency_ms_p95']:>10}{result['latency_ms_p99']:>10}")
+    else:
+        for concurrency in args.concurrency:
+            for key, value in asyncio.run(run(args.url, args.requests, concurrency)).items():
+                print(f"{key}: {value}")
+            print()
@@ -1,32 +1,30 @@
 from fastapi import FastAPI
 import uvicorn
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 import hashlib
 import os
 from fastapi_jwt_auth import AuthJWT
 from fastapi_jwt_auth.exceptions import AuthJWTException
-from fastapi import HTTPException, Depends, UploadFile, File
+from fastapi import HTTPException, Depends, UploadFile, File, Header, Query
 from pydantic import BaseModel
 import re
 from pydantic import Field
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 from google.auth.transport import requests as google_requests
 from google.oauth2 import id_token
 from dotenv import load_dotenv
 import base64
-import pickle
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request  
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from email.mime.text import MIMEText
 from pathlib import Path
 import requests
 import json
 from bson import ObjectId
-import random
+from bson.errors import InvalidId
 import PyPDF2
-import threading
 import time
 import json
 from contextlib import asynccontextmanager
@@ -35,6 +33,30 @@ import io
 import fitz
 from typing import List
 from datetime import timedelta, datetime
+import asyncio
+from gemini_client import generate_json, close_client, key_pool
+from resume_cache import ResumeCache, hash_pdf, jobposts_fingerprint, match_key
+from resume_store import ResumeStore
+from gmail_sync import GmailSync
+from ranking_engine import RankingEngine, content_hash, job_post_profile
+from screening_cache import ScreeningCache
+from repository import Repository
+from counters import Counters, COUNTER_RECONCILE_INTERVAL
+from job_digest import JobDigests, estimate_tokens
+from job_selector import select_job_posts
+from resume_batch import ResumeBatcher, split_batch_response
+from job_generation import JobPostGenerator, PENDING, FAILED, TERMINAL_STATES
+from prescore import prerank, ranking_agreement
+from skill_index import candidate_facets, search_pipeline
+from credentials_cache import CredentialStore, CredentialsNotFound
+from pagination import keyset_find, sort_cursor, stream_page, render_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from response_cache import ResponseCache, etag_matches
+from gmail_batch import fetch_messages, fetch_pdf_attachments, iter_parts
+from scheduler import MailboxScheduler
+from slot_schedule import expand_recurrence, slot_document, slot_json, to_utc, migrate_slot_times, MAX_SLOTS_PER_REQUEST
+from slot_index import SlotIndex
+from indexes import ensure_indexes, explain_hot_queries
+from ingest_queue import IngestQueue, IngestWorker, PermanentError, INGEST_WORKERS, FETCHED, EXTRACTED, MATCHED, STORED, DEAD
 
 
 
@@ -50,6 +72,7 @@ SCOPES = "https://www.googleapis.com/auth/gmail.send https://www.googleapis.com/
 
 BASE_DIR = Path.cwd() / "tickle"
 BASE_DIR.mkdir(parents=True, exist_ok=True)
+credential_store = CredentialStore(BASE_DIR)
 
 load_dotenv()
 
@@ -62,8 +85,26 @@ pdf_matches = db['pdf_matches']
 candidates = db['candidates']
 ranking = db['ranking']
 screening = db['screening']
+candidate_scores = db['candidate_scores']
 SLOTS_DB = db['slots']
 
+# ✅ Async data access for the request handlers
+repository = Repository(mongo_uri)
+
+# Max number of uploaded resumes processed at the same time
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "5"))
+JOBPOST_STATUS_POLL_INTERVAL = float(os.getenv("JOBPOST_STATUS_POLL_INTERVAL", "2"))
+JOBPOST_STATUS_STREAM_TIMEOUT = float(os.getenv("JOBPOST_STATUS_STREAM_TIMEOUT", "300"))
+screening_cache = ScreeningCache(repository.screening)
+job_digests = JobDigests(jobposts)
+counters = Counters(db['counters'])
+home_cache = ResponseCache()
+slot_index = SlotIndex(repository.slots)
+resume_store = ResumeStore(db['resume_texts'])
+resume_cache = ResumeCache(db['resume_cache'], resume_store)
+gmail_sync = GmailSync(db['gmail_sync'])
+ingest_queue = IngestQueue(db['ingest_queue'])
+
 class Settings(BaseModel):
     authjwt_secret_key: str = Field(default="your_secret_key")
 
@@ -89,9 +130,26 @@ def check_password(stored_hash: str, password: str) -> bool:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    threading.Thread(target=process_emails_and_match_jobs, daemon=True).start()
+    await asyncio.to_thread(ensure_indexes, db)
+    migrated_slots = await asyncio.to_thread(migrate_slot_times, SLOTS_DB)
+    if migrated_slots:
+        print(f"✅ Converted the times of {migrated_slots} slots to datetimes.")
+    mailbox_scheduler.start()
+    ingest_tasks = [asyncio.create_task(ingest_worker.run_forever()) for _ in range(INGEST_WORKERS)]
     print("✅ Background email processor started.")
+    reconcile_task = asyncio.create_task(reconcile_counters_forever())
+    resumed = await job_post_generator.resume_unfinished(get_gemini_api_key)
+    if resumed:
+        print(f"✅ Resumed generation of {resumed} job posts.")
     yield  # Allows the app to continue running
+    # Waiting for running mailbox jobs blocks, so do it off the event loop
+    await asyncio.to_thread(mailbox_scheduler.stop)
+    ingest_worker.stop()
+    await asyncio.gather(*ingest_tasks, return_exceptions=True)
+    await job_post_generator.stop()
+    reconcile_task.cancel()
+    await close_client()
+    repository.close()
     print("⏹️ Background email processor stopped.")
 
 app = FastAPI(lifespan=lifespan, title="HR Management System", description="This is a HR Management System API", version="1.0.0")
@@ -126,20 +184,46 @@ def get_status():
     tags=["Root"]
 )
 def welcome():
-    # Count total number of hrs, jobposts, and candidates
-    total_hrs = hrs.count_documents({})
-    total_jobposts = jobposts.count_documents({})
-    total_candidates = candidates.count_documents({})
-    #print(total_hrs, total_jobposts, total_candidates)
+    # Total number of hrs, jobposts, and candidates from the maintained counters
+    totals = counters.get(["hrs", "jobposts", "candidates"])
 
     return {
         "message": "Welcome to HR Management System",
-        "total_hrs": total_hrs,
-        "total_jobposts": total_jobposts,
-        "total_candidates": total_candidates
+        "total_hrs": totals["hrs"],
+        "total_jobposts": totals["jobposts"],
+        "total_candidates": totals["candidates"]
     }
 
 
+@app.get(
+    "/dashboard/{userId}",
+    summary="HR dashboard totals",
+    description="Number of job posts and candidates of a single HR user",
+    tags=["Root"]
+)
+def get_dashboard(userId: str):
+    totals = counters.get(["jobposts", "candidates"], userId)
+    return {
+        "userId": userId,
+        "total_jobposts": totals["jobposts"],
+        "total_candidates": totals["candidates"]
+    }
+
+
+async def reconcile_counters_forever():
+    """
+    Recompute the counters at startup and every COUNTER_RECONCILE_INTERVAL seconds.
+    """
+    while True:
+        try:
+            drifted = await asyncio.to_thread(counters.reconcile, db)
+            if drifted:
+                print(f"Reconciled {len(drifted)} drifted counters: {sorted(drifted)}")
+        except Exception as e:
+            print(f"Counter reconciliation failed: {e}")
+        await asyncio.sleep(COUNTER_RECONCILE_INTERVAL)
+
+
 
 class SignupRequest(BaseModel):
     email: str 
@@ -158,7 +242,12 @@ def signup(request: SignupRequest, Authorize: AuthJWT = Depends()):
     
     hashed_password = hash_password(request.password)
     hr = {"email": request.email, "password": hashed_password, "user_type": "email"}
-    hrs.insert_one(hr)
+    try:
+        hrs.insert_one(hr)
+    except DuplicateKeyError:
+        # ✅ A concurrent signup with the same email won the unique index
+        raise HTTPException(status_code=400, detail="Email already exists")
+    counters.increment("hrs")
     token = Authorize.create_access_token(subject=request.email)
 
     return {"message": "User registered successfully", "token": token, "userId": str(hr['_id'])}
@@ -202,16 +291,23 @@ def google_auth(data: GoogleAuthRequest, Authorize: AuthJWT = Depends()):
         
         user = hrs.find_one({"email": email})
         if not user:
-            user = {
+            new_user = {
                 "name": id_info.get('name', ''), 
                 "email": email, 
                 "picture": id_info.get('picture', ''), 
                 "user_type": "google" 
             }
-            insert_result = hrs.insert_one(user)
-            user_id = str(insert_result.inserted_id)
-            message = "User signed up successfully"
-        else:
+            try:
+                insert_result = hrs.insert_one(new_user)
+                counters.increment("hrs")
+                user_id = str(insert_result.inserted_id)
+                message = "User signed up successfully"
+            except DuplicateKeyError:
+                # ✅ A concurrent request created the account first: log in to it
+                user = hrs.find_one({"email": email})
+                if not user:
+                    raise HTTPException(status_code=400, detail="Email already exists")
+        if user:
             user_id = str(user["_id"])
             message = "Login successful"
         
@@ -270,7 +366,7 @@ async def authenticate_user(auth_data: AuthData):
         "grant_type": "authorization_code",
     }
 
-    response = requests.post(TOKEN_URL, data=data)
+    response = await asyncio.to_thread(requests.post, TOKEN_URL, data=data)
     if response.status_code != 200:
         raise HTTPException(status_code=400, detail="Failed to obtain access token")
 
@@ -281,14 +377,10 @@ async def authenticate_user(auth_data: AuthData):
 
     creds = Credentials.from_authorized_user_info(creds_data)
 
-    token_path = BASE_DIR / f"{userId}.pickle"
-    with open(token_path, "wb") as token_file:
-        pickle.dump(creds, token_file)
-
-    hr = hrs.find_one({"_id": ObjectId(userId)})
-    hr["google_auth"] = True
+    await asyncio.to_thread(credential_store.save, userId, creds)
 
-    hrs.update_one({"_id": ObjectId(userId)}, {"$set": hr})
+    await repository.hrs.update_one({"_id": ObjectId(userId)}, {"$set": {"google_auth": True}})
+    home_cache.invalidate(userId)
 
     return {}
 
@@ -296,18 +388,29 @@ async def authenticate_user(auth_data: AuthData):
 
 # 📌 Step 3: Retrieve Stored Credentials
 def get_credentials(userId: str):
-    file_path = BASE_DIR / f"{userId}.pickle"
-    if not file_path.exists():
+    try:
+        return credential_store.get_credentials(userId)
+    except CredentialsNotFound:
         raise HTTPException(status_code=404, detail="Credentials not found. Authenticate first.")
 
-    with open(file_path, "rb") as token:
-        creds = pickle.load(token)
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+def get_google_service(userId: str, api: str, version: str):
+    """
+    Cached Gmail / Calendar service for the user (credentials refreshed and persisted as needed).
+    """
+    try:
+        return credential_store.get_service(userId, api, version)
+    except CredentialsNotFound:
+        raise HTTPException(status_code=404, detail="Credentials not found. Authenticate first.")
 
-    return creds
+
+def execute_google_request(userId: str, api: str, version: str, make_request):
+    """
+    Execute `make_request(service)` with the user's cached service. Services are
+    cached per thread (their HTTP client is not thread-safe), so from async code
+    run this whole function in one asyncio.to_thread call.
+    """
+    return make_request(get_google_service(userId, api, version)).execute()
 
 # 📌 Step 4: Send Email using Gmail API
 @app.post(
@@ -320,8 +423,7 @@ def send_email(userId: str, to_email: str, subject: str, body: str):
     """
     Send an email using Gmail API for the authenticated user.
     """
-    creds = get_credentials(userId)
-    service = build("gmail", "v1", credentials=creds)
+    service = get_google_service(userId, "gmail", "v1")
     
     message = MIMEText(body)
     message["to"] = to_email
@@ -345,34 +447,50 @@ def extract_text_pymupdf(pdf_bytes):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting text: {str(e)}")
 
+
+def extract_resume_text(pdf_bytes):
+    """
+    Extract resume text through the content-addressed cache.
+    Returns (pdf_hash, pdf_text).
+    """
+    pdf_hash = hash_pdf(pdf_bytes)
+    pdf_text = resume_cache.get_text(pdf_hash)
+    if pdf_text is None:
+        pdf_text = extract_text_pymupdf(io.BytesIO(pdf_bytes))
+        resume_cache.put_text(pdf_hash, pdf_text)
+    return pdf_hash, pdf_text
+
 # 📌 Function to Fetch Emails & Extract PDF Attachments
 def fetch_recent_emails(userId):
     """
-    Fetch emails from the last 1.15 hours and extract text from any PDF attachments.
+    Fetch emails received since the user's last sync checkpoint together with
+    their PDF attachment bytes.
+    Returns (email_list, checkpoint); commit the checkpoint with
+    `gmail_sync.commit` once the emails have been processed.
     """
     try:
-        creds = get_credentials(userId)  # Ensure credentials exist
+        service = get_google_service(userId, "gmail", "v1")  # Ensure credentials exist
     except HTTPException as e:
         print(f"Skipping user {userId}: {e.detail}")
-        return []  # Skip processing for this user
-
-    service = build("gmail", "v1", credentials=creds)
+        return [], None  # Skip processing for this user
 
     try:
-        # ✅ Fetch emails from the last 1.15 hours
-        time_limit = datetime.utcnow() - timedelta(hours=0, minutes=5)
-        query = f"after:{int(time_limit.timestamp())}"
+        # ✅ Only messages added since the last checkpoint (history API, full-sync fallback)
+        message_ids, checkpoint = gmail_sync.poll(service, userId)
 
-        results = service.users().messages().list(userId="me", q=query).execute()
-        messages = results.get("messages", [])
-
-        if not messages:
+        if not message_ids:
             print(f"No new emails found for user: {userId}")
-            return []
+            return [], checkpoint
+
+        # ✅ Message metadata and PDF attachments in bulk via the Gmail batch endpoint
+        batch_stats = []
+        messages, failed_messages = fetch_messages(service, message_ids, batch_stats)
+        attachments, failed_attachments = fetch_pdf_attachments(service, messages, batch_stats)
 
         email_list = []
-        for msg in messages:
-            msg_detail = service.users().messages().get(userId="me", id=msg["id"]).execute()
+        for message_id, msg_detail in messages.items():
+            if message_id in failed_attachments:
+                continue  # fetched again on the next poll
             headers = msg_detail["payload"]["headers"]
 
             # ✅ Extract sender and subject
@@ -380,47 +498,55 @@ def fetch_recent_emails(userId):
             sender = next((h["value"] for h in headers if h["name"] == "From"), "Unknown Sender")
 
             body = "No Body Found"
-            pdf_text = None
+            pdf_data = None
 
-            if "parts" in msg_detail["payload"]:
-                for part in msg_detail["payload"]["parts"]:
-                    if part["mimeType"] == "text/plain":
-                        body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
+            for part in iter_parts(msg_detail["payload"]):
+                if part["mimeType"] == "text/plain" and part["body"].get("data"):
+                    body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8")
 
-                    if "filename" in part and part["filename"].endswith(".pdf"):
-                        if "attachmentId" in part["body"]:
-                            attachment_id = part["body"]["attachmentId"]
-                            attachment = service.users().messages().attachments().get(
-                                userId="me", messageId=msg["id"], id=attachment_id
-                            ).execute()
-
-                            pdf_data = base64.urlsafe_b64decode(attachment["data"])
-
-                            # ✅ Extract text using PyMuPDF (fitz)
-                            pdf_text = extract_text_pymupdf(io.BytesIO(pdf_data))
+            if attachments[message_id]:
+                pdf_data = attachments[message_id][-1]
 
             email_list.append({
+                "Message_Id": message_id,
                 "From": sender,
                 "Subject": subject,
                 "Body": body,
-                "PDF_Text": pdf_text
+                "PDF_Data": pdf_data
             })
 
-        return email_list
+        checkpoint["last_poll"]["api_calls"] += sum(batch["size"] for batch in batch_stats)
+        checkpoint["last_poll"]["batch_round_trips"] = len(batch_stats)
+        checkpoint["last_poll"]["batches"] = batch_stats
+        print(f"Gmail sync for user {userId}: {checkpoint['last_poll']}")
+
+        # ✅ Messages that could not be fetched are retried by the next polls,
+        # the checkpoint still advances past everything else
+        if failed_messages or failed_attachments:
+            print(f"Retrying on the next Gmail poll of user {userId}: "
+                  f"{len(failed_messages)} messages and {len(failed_attachments)} attachments failed")
+            gmail_sync.mark_failed(userId, checkpoint, set(failed_messages) | failed_attachments)
+        return email_list, checkpoint
 
     except Exception as error:
         print(f"An error occurred for user {userId}: {error}")
-        return []
+        return [], None
 
 # 📌 Send job posts & extracted PDF text to Gemini for matching
-def match_jobs_with_gemini(userId, extracted_text, email_subject):
+async def match_jobs_with_gemini(userId, extracted_text, email_subject):
     """
     Send extracted resume text and job posts to Gemini API for matching.
+    Only the job posts most similar to the resume are sent; when the email
+    subject names exactly one job title, that post is used without asking Gemini.
     """
-    GEMINI_API_KEY = hrs.find_one({"_id": ObjectId(userId)}).get("gemini_api_key", "")
-    GEMINI_MODEL = "gemini-2.0-flash"
+    GEMINI_API_KEY = await repository.get_gemini_api_key(userId)
 
-    all_job_posts = list(jobposts.find({"created_by": userId}))
+    # ✅ Compact digests instead of the raw job-post documents
+    digests, raw_tokens, _ = await asyncio.to_thread(job_digests.for_user, userId)
+
+    # ✅ Local selection: the exact title match, or the top-k most similar posts
+    selected, selection = select_job_posts(digests, extracted_text, email_subject)
+    all_job_posts = json.dumps(selected, ensure_ascii=False)
 
     # ✅ Construct prompt for Gemini
     prompt = f"""
@@ -436,7 +562,7 @@ def match_jobs_with_gemini(userId, extracted_text, email_subject):
     {email_subject} **It can be the filename if it is not relevant then focus on the extracted text**
     and all job posts:
     {all_job_posts} 
-    identify the which job post is applied by the user and return jobpost id.
+    identify the which job post is applied by the user and return its "id" as jobpost id.
 
     here is the example of the data you should return in json format:
     ```json
@@ -457,80 +583,308 @@ def match_jobs_with_gemini(userId, extracted_text, email_subject):
     YOU MUST RETURN A JSON FORMAT OF THE CANDIDATE DATA
     """
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    headers = {
-        "Content-Type": "application/json",
-    }
-    data = {
-        "contents": [{
-            "parts": [{
-                "text": prompt
-            }]
-        }]
-    }
+    tokens_after = estimate_tokens(prompt)
+    job_digests.record(tokens_after - estimate_tokens(all_job_posts) + raw_tokens, tokens_after, selection)
+
+    matched_jobs = await generate_json(prompt, GEMINI_API_KEY)
 
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-    response.raise_for_status()
-    response_json = response.json()
+    # The subject already decided the job post
+    if selection == "exact" and isinstance(matched_jobs, dict) and isinstance(matched_jobs.get("candidate"), dict):
+        matched_jobs["candidate"]["jobpost_id"] = selected[0]["id"]
 
-    generated_text = response_json["candidates"][0]["content"]["parts"][0]["text"]
-    generated_text = generated_text.replace("```json", "").replace("```", "").strip()
-    return json.loads(generated_text)
+    return matched_jobs
 
 
 
-# 📌 Process Emails & Match Job Posts Every Hour
-def process_emails_and_match_jobs():
+async def match_jobs_batch_with_gemini(userId, resumes):
     """
-    Background task that fetches recent emails, extracts PDF text, 
-    and matches it with job posts using Gemini AI.
+    Match several (resume text, email subject) pairs in one Gemini request
+    with a shared job-post context. Returns one result per resume, None for
+    each resume whose part of the response is missing or invalid.
     """
-    while True:
-        
+    GEMINI_API_KEY = await repository.get_gemini_api_key(userId)
+
+    digests, raw_tokens, _ = await asyncio.to_thread(job_digests.for_user, userId)
+
+    # ✅ Shared context: the union of the posts selected for each resume
+    context = {}
+    exact_ids = []
+    for pdf_text, email_subject in resumes:
+        selected, selection = select_job_posts(digests, pdf_text, email_subject)
+        exact_ids.append(selected[0]["id"] if selection == "exact" else None)
+        for digest in selected:
+            context.setdefault(digest["id"], digest)
+    all_job_posts = json.dumps(list(context.values()), ensure_ascii=False)
+
+    resume_blocks = "\n".join(
+        f"""
+    ### resume_index: {index}
+    **Email Subject:** {email_subject}
+    **Resume Text:**
+    {pdf_text}
+    """
+        for index, (pdf_text, email_subject) in enumerate(resumes)
+    )
 
-        for user in hrs.find():
-            userId = str(user["_id"])
+    # ✅ Construct prompt for Gemini
+    prompt = f"""
+    Here are the extracted texts of {len(resumes)} different resumes, each marked with its resume_index.
+    For EACH resume separately, collect the data of the candidate. Never mix information between resumes.
+    {resume_blocks}
+    You must check experience, skills, projects, education, and location of each candidate. May be
+    the information is not in the same order as mentioned above. You have to extract the information
+    from the text may be they are disguised in the text.
+    The email subject can be the filename; if it is not relevant then focus on the extracted text.
+    and all job posts:
+    {all_job_posts}
+    identify for each resume which job post is applied by the candidate and return its "id" as jobpost id.
 
-            try:
-                emails = fetch_recent_emails(userId)
-            except HTTPException as e:
-                print(f"Skipping user {userId}: {e.detail}")
-                continue  # Skip this user if authentication is missing
+    here is the example of the data you should return in json format, with one entry per resume:
+    ```json
+    {{
+        "results": [
+            {{
+                "resume_index": 0,
+                "candidate": {{
+                    "jobpost_id": "jobpost_id",
+                    "name": "John Doe",
+                    "email": "john@email.com",
+                    "skills": ["Python", "JavaScript", "React"],
+                    "experience": "5 years",
+                    "projects": ["Project 1", "Project 2"],
+                    "education": "Bachelor's Degree",
+                    "location": "San Francisco, CA"
+                }}
+            }}
+        ]
+    }}
+    ```
+    DO NOT CHANGE ANY NAME CONVENTION IN THE JSON FORMAT.
+    YOU MUST RETURN A JSON FORMAT WITH THE DATA OF EVERY CANDIDATE
+    """
+
+    tokens_after = estimate_tokens(prompt)
+    job_digests.record(tokens_after - estimate_tokens(all_job_posts) + raw_tokens, tokens_after, "batch")
+
+    response = await generate_json(prompt, GEMINI_API_KEY)
+    results = split_batch_response(response, resumes, set(context))
+
+    # The subject already decided these job posts
+    for result, exact_id in zip(results, exact_ids):
+        if result and exact_id:
+            result["candidate"]["jobpost_id"] = exact_id
+    return results
+
+
+# 📌 Resumes matched at the same time (bulk uploads) share one Gemini request
+resume_batcher = ResumeBatcher(match_jobs_batch_with_gemini, match_jobs_with_gemini)
+
+
+async def match_resume(userId, pdf_hash, pdf_text, email_subject, batch=False):
+    """
+    Match a resume against the user's job posts, reusing the cached result
+    while the PDF, the job posts selected for its subject and the user's
+    job-post set are unchanged. With `batch`, a cache miss is matched together
+    with other resumes of the same user.
+    """
+    fingerprint = await asyncio.to_thread(jobposts_fingerprint, jobposts, userId)
+
+    # ✅ The same PDF sent for another post (subject) is a different match
+    digests, _, _ = await asyncio.to_thread(job_digests.for_user, userId)
+    selected, selection = select_job_posts(digests, pdf_text, email_subject)
+    key = match_key(selection, selected, email_subject)
+
+    matched_jobs = await asyncio.to_thread(resume_cache.get_match, pdf_hash, userId, fingerprint, key)
+    if matched_jobs is None:
+        if batch:
+            matched_jobs = await resume_batcher.submit(userId, pdf_text, email_subject)
+        else:
+            matched_jobs = await match_jobs_with_gemini(userId, pdf_text, email_subject)
+        if matched_jobs:
+            await asyncio.to_thread(resume_cache.put_match, pdf_hash, userId, fingerprint, key, matched_jobs)
+    return matched_jobs
+
+
+def store_candidate(userId, email, resume_text_id, matched_jobs, ingest_key):
+    """
+    Save a matched resume to `pdf_matches` and `candidates`. Keyed on the
+    ingestion item, so a retried item never inserts a second copy. The resume
+    text itself lives once in `resume_texts`, referenced by `resume_text_id`.
+    """
+    document = {
+        "userId": userId,
+        "email": email,
+        "resume_text_id": resume_text_id,
+        "candidate": matched_jobs,
+        "ingest_key": ingest_key
+    }
+    pdf_matches.update_one({"ingest_key": ingest_key}, {"$setOnInsert": document}, upsert=True)
+
+    # ✅ Normalized skills / experience / location for faceted search
+    facets = candidate_facets((matched_jobs or {}).get("candidate"))
+    result = candidates.update_one({"ingest_key": ingest_key}, {"$setOnInsert": {**document, "facets": facets}}, upsert=True)
+    if result.upserted_id is not None:
+        counters.increment("candidates", userId)
 
-            for email in emails:
-                if email["PDF_Text"]:  # Process only if a PDF was found
-                    matched_jobs = match_jobs_with_gemini(userId, email["PDF_Text"], email["Subject"])
 
-                    if matched_jobs:
-                        pdf_matches.insert_one({
-                            "userId": userId,
-                            "email": email["From"],
-                            "pdf_text": email["PDF_Text"],
-                            "candidate": matched_jobs
-                        })
-                        candidates.insert_one({
-                            "userId": userId,
-                            "email": email["From"],
-                            "pdf_text": email["PDF_Text"],
-                            "candidate": matched_jobs
-                        })
+# 📌 Ingestion pipeline steps: fetched -> extracted -> matched -> stored
+async def ingest_extract(item):
+    try:
+        pdf_hash, _ = await asyncio.to_thread(extract_resume_text, bytes(item["pdf_bytes"]))
+    except HTTPException as e:
+        # ✅ An unreadable PDF stays unreadable: don't retry it
+        raise PermanentError(e.detail)
+    return EXTRACTED, {"pdf_hash": pdf_hash}, ["pdf_bytes"]
+
 
-        time.sleep(3600)  # Wait for 1 hour before next run
+async def ingest_match(item):
+    pdf_text = await asyncio.to_thread(resume_cache.get_text, item["pdf_hash"])
+    if pdf_text is None:
+        raise ValueError("Extracted text missing from resume cache")
+    matched_jobs = await match_resume(item["userId"], item["pdf_hash"], pdf_text, item["subject"], item.get("batch", False))
+    if not matched_jobs:
+        raise ValueError("Gemini returned no candidate data")
+    return MATCHED, {"candidate": matched_jobs}, None
 
 
-# 📌 Start Background Process
-def start_email_matching():
+async def ingest_store(item):
+    resume_text_id = await asyncio.to_thread(resume_cache.get_text_id, item["pdf_hash"])
+    if resume_text_id is None:
+        raise ValueError("Extracted text missing from resume cache")
+    await asyncio.to_thread(store_candidate, item["userId"], item["sender"], resume_text_id, item["candidate"], item["_id"])
+    return STORED, {}, None
+
+
+ingest_worker = IngestWorker(ingest_queue, {
+    FETCHED: ingest_extract,
+    EXTRACTED: ingest_match,
+    MATCHED: ingest_store,
+})
+
+
+# 📌 Process one HR mailbox: fetch new emails & queue their resumes
+def process_mailbox(userId):
     """
-    Start a background thread to process emails and match job posts every hour.
+    Scheduler job for a single HR user: fetches new emails and adds every PDF
+    attachment to the ingestion queue, where it is extracted, matched with the
+    user's job posts using Gemini AI and stored.
     """
-    threading.Thread(target=process_emails_and_match_jobs, daemon=True).start()
+    emails, checkpoint = fetch_recent_emails(userId)
+
+    for email in emails:
+        if email["PDF_Data"]:  # Process only if a PDF was found
+            ingest_queue.enqueue(userId, "gmail", email["Message_Id"], email["PDF_Data"], email["From"], email["Subject"])
+
+    # ✅ Advance the sync cursor only after this user's emails are queued
+    if checkpoint:
+        gmail_sync.commit(userId, checkpoint)
+
+
+def list_mailbox_user_ids():
+    return [str(user["_id"]) for user in hrs.find({}, {"_id": 1})]
+
+
+# 📌 One scheduled job per mailbox on a bounded worker pool
+mailbox_scheduler = MailboxScheduler(process_mailbox, list_mailbox_user_ids)
+
+
+@app.get(
+    "/ingest-queue/stats",
+    summary="Ingestion queue statistics",
+    description="Number of queued resumes in each state, optionally for a single HR user",
+    tags=["Health Check"]
+)
+def get_ingest_queue_stats(userId: str = None):
+    return ingest_queue.get_stats(userId)
+
+
+@app.get(
+    "/diagnostics/query-plans",
+    summary="Query plans of the hot queries",
+    description="Runs explain() on each hot query and reports whether it uses an index",
+    tags=["Health Check"]
+)
+def get_query_plans():
+    return {"queries": explain_hot_queries(db)}
+
+
+@app.get(
+    "/resume-cache/stats",
+    summary="Resume cache statistics",
+    description="Text and match hits, misses and hit rates of the resume cache since startup",
+    tags=["Health Check"]
+)
+def get_resume_cache_stats():
+    return resume_cache.get_stats()
+
+
+@app.get(
+    "/screening/stats",
+    summary="Screening cache statistics",
+    description="Hits, misses, stale entries, forced re-screenings and hit rate since startup",
+    tags=["Health Check"]
+)
+def get_screening_stats():
+    return screening_cache.get_stats()
+
+
+@app.get(
+    "/home-cache/stats",
+    summary="Home page cache statistics",
+    description="Hits, misses, 304 responses, invalidations and hit rate since startup",
+    tags=["Health Check"]
+)
+def get_home_cache_stats():
+    return home_cache.get_stats()
+
+
+@app.get(
+    "/slot-index/stats",
+    summary="Slot index statistics",
+    description="Interviewers and slots held in memory, reloads, overlap checks and conflicts since startup",
+    tags=["Health Check"]
+)
+def get_slot_index_stats():
+    return slot_index.get_stats()
+
+
+@app.get(
+    "/matching/prompt-stats",
+    summary="Resume-matching prompt size",
+    description="Estimated prompt tokens with raw job posts vs. compact digests, job-post selection and batching since startup",
+    tags=["Health Check"]
+)
+def get_matching_prompt_stats():
+    return {**job_digests.get_stats(), "batching": resume_batcher.get_stats()}
+
+
+@app.get(
+    "/gemini/keys",
+    summary="Gemini key pool status",
+    description="Per-key requests, 429s, errors, in-flight requests, tokens left and cooldown",
+    tags=["Health Check"]
+)
+def get_gemini_keys():
+    return key_pool.get_stats()
+
+
+@app.get(
+    "/scheduler/status",
+    summary="Background email processor status",
+    description="Queue depth, running jobs and the last run of each HR mailbox",
+    tags=["Health Check"]
+)
+def get_scheduler_status():
+    return mailbox_scheduler.get_status()
+
 
 # 📌 API Endpoints
 def fetch_emails(userId: str):
     """
     Manually fetch emails from the inbox.
     """
-    return fetch_recent_emails(userId)
+    emails, _ = fetch_recent_emails(userId)
+    return emails
 
 def get_matched_jobs(userId: str):
     """
@@ -545,9 +899,31 @@ def get_matched_jobs(userId: str):
     description="Home page containing user details and job posts",
     tags=["Home"]
 )
-def home(userId: str):
+async def home(userId: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None, fields: str = "summary",
+               if_none_match: str = Header(None)):
+    """
+    Served from the per-user home cache while nothing on the page has changed;
+    a client sending back the ETag it was given gets an empty 304.
+    """
+    variant = (limit, after, fields)
+    cached = home_cache.get(userId, variant)
+    if cached:
+        etag, body = cached
+    else:
+        generation = home_cache.generation(userId)
+        body = await render_home(userId, limit, after, fields)
+        etag = home_cache.put(userId, variant, body, generation)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        home_cache.count_not_modified()
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def render_home(userId, limit, after, fields):
     # ✅ Convert userId to ObjectId
-    user = hrs.find_one({"_id": ObjectId(userId)})
+    user = await repository.get_user(userId)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -555,23 +931,17 @@ def home(userId: str):
     user["_id"] = str(user["_id"])
     user["google_auth"] = user.get("google_auth", False)
     
-    # ✅ Check and Assign Gemini API Key if missing
+    # ✅ Check and Assign Gemini API Key if missing (least-used key of the pool)
     if not user.get("gemini_api_key"):
-        with open("gemini_key.json") as f:
-            gemini_keys = json.load(f)
-        gemini_api_key = gemini_keys[str(random.randint(0, 2))]
+        gemini_api_key = key_pool.assign_key()
         
         # ✅ Update the database with the new Gemini API key
-        hrs.update_one({"_id": ObjectId(userId)}, {"$set": {"gemini_api_key": gemini_api_key}})
+        await repository.set_gemini_api_key(userId, gemini_api_key)
         user["gemini_api_key"] = gemini_api_key  # Add it to response
     
-    alljobposts = []
-    
-    for jobpost in jobposts.find({"created_by": userId}):
-        jobpost["_id"] = str(jobpost["_id"])  # ✅ Convert ObjectId to string
-        alljobposts.append(jobpost)
-
-    return {"user": user, "jobposts": alljobposts}  # ✅ Corrected return statement
+    # ✅ One page of job posts, rendered from the cursor
+    cursor = keyset_find(repository.jobposts, {"created_by": userId}, "jobposts", fields, limit, after)
+    return await render_page(cursor, "jobposts", limit, extra={"user": user})
 
 
 class JobPostRequest(BaseModel):
@@ -588,26 +958,111 @@ class JobPostRequest(BaseModel):
     description="This endpoint can be used to create a job post",
     tags=["Job Post"]
 )
-def create_jobpost(userId: str, job: JobPostRequest):
+async def create_jobpost(userId: str, job: JobPostRequest):
+    """
+    Save the job post and return right away; the Gemini-generated content is
+    added in the background. Follow it with /jobpost-status/{userId}/{job_post_id}.
+    """
+    # ✅ Fetch the Gemini API key for the user
+    user = await repository.get_user(userId, {"gemini_api_key": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    GEMINI_API_KEY = user.get("gemini_api_key")
+
     jobpost = job.dict()
     jobpost["created_by"] = userId
+    jobpost["generation_status"] = PENDING
 
     # ✅ Insert job post into database
-    jobposts.insert_one(jobpost)
+    await repository.jobposts.insert_one(jobpost)
 
     post_id = str(jobpost["_id"])
+    await asyncio.to_thread(counters.increment, "jobposts", userId)
+    await asyncio.to_thread(job_digests.refresh, post_id)
+    home_cache.invalidate(userId)
 
-    # ✅ Fetch the Gemini API key for the user
-    user = hrs.find_one({"_id": ObjectId(userId)})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # ✅ Generate job post using Gemini AI in the background
+    job_post_generator.submit(post_id, jobpost, GEMINI_API_KEY)
 
-    GEMINI_API_KEY = user.get("gemini_api_key")
+    return {"message": "Job post created successfully", "job_post_id": post_id, "generation_status": PENDING}
 
-    # ✅ Generate job post using Gemini AI
-    generate_job_post(jobpost, GEMINI_API_KEY, post_id)
 
-    return {"message": "Job post created successfully", "job_post_id": post_id}
+def get_gemini_api_key(userId):
+    user = hrs.find_one({"_id": ObjectId(userId)}, {"gemini_api_key": 1}) if userId else None
+    return (user or {}).get("gemini_api_key", "")
+
+
+def get_jobpost_status_or_404(userId, post_id):
+    try:
+        status = job_post_generator.get_status(post_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail=f"Invalid job post id: {post_id}")
+    if not status or status["created_by"] != userId:
+        raise HTTPException(status_code=404, detail="Job post not found")
+    return status
+
+
+@app.get(
+    "/jobpost-status/{userId}/{post_id}",
+    summary="Job post generation status",
+    description="pending, generating, ready or failed (with the error)",
+    tags=["Job Post"]
+)
+def get_jobpost_status(userId: str, post_id: str):
+    return get_jobpost_status_or_404(userId, post_id)
+
+
+@app.get(
+    "/jobpost-status/{userId}/{post_id}/stream",
+    summary="Job post generation status stream",
+    description="Server-sent events with the generation status until it is ready or failed",
+    tags=["Job Post"]
+)
+async def stream_jobpost_status(userId: str, post_id: str):
+    status = await asyncio.to_thread(get_jobpost_status_or_404, userId, post_id)
+
+    async def events():
+        last = None
+        deadline = time.monotonic() + JOBPOST_STATUS_STREAM_TIMEOUT
+        current = status
+        while True:
+            if current["generation_status"] != last:
+                last = current["generation_status"]
+                yield f"data: {json.dumps(current, default=str)}\n\n"
+            if last in TERMINAL_STATES or time.monotonic() > deadline:
+                return
+            # Wakes up as soon as this process finishes the post; polls otherwise
+            await job_post_generator.wait(post_id, JOBPOST_STATUS_POLL_INTERVAL)
+            current = await asyncio.to_thread(job_post_generator.get_status, post_id)
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post(
+    "/regenerate-jobpost/{userId}/{post_id}",
+    summary="Retry job post generation",
+    description="Runs the Gemini generation again for a job post whose generation failed",
+    tags=["Job Post"]
+)
+async def regenerate_jobpost(userId: str, post_id: str):
+    # Async so that submit() runs on the event loop, where the generation task lives
+    status = await asyncio.to_thread(get_jobpost_status_or_404, userId, post_id)
+    if status["generation_status"] != FAILED:
+        raise HTTPException(status_code=409, detail=f"Job post generation is {status['generation_status']}")
+
+    jobpost, GEMINI_API_KEY = await asyncio.gather(
+        repository.get_job_post(post_id),
+        repository.get_gemini_api_key(userId)
+    )
+    await repository.jobposts.update_one(
+        {"_id": ObjectId(post_id)}, {"$set": {"generation_status": PENDING, "generation_error": None}}
+    )
+    home_cache.invalidate(userId)
+    job_post_generator.submit(post_id, jobpost, GEMINI_API_KEY)
+    return {"job_post_id": post_id, "generation_status": PENDING}
 
 
     
@@ -618,50 +1073,86 @@ def create_jobpost(userId: str, job: JobPostRequest):
     description="This endpoint allows users to upload multiple PDF resumes.",
     tags=["Resume"]
 )
-async def upload_pdfs(userId: str, files: List[UploadFile] = File(...)):
+async def upload_pdfs(userId: str, files: List[UploadFile] = File(...), batch: bool = True):
     """
     Upload multiple PDF resumes for parsing and matching with job posts.
+    Files are processed concurrently (up to UPLOAD_CONCURRENCY at a time) and
+    each result is streamed back as one NDJSON line as soon as it finishes,
+    followed by a summary line with the throughput. A bad file only fails its own line.
+    With `batch` (the default) resumes are matched several per Gemini request;
+    `batch=false` matches each file on its own.
     """
-    matched_jobs_list = []
-
-    for file in files:
-        if not file.filename.lower().endswith(".pdf"):
-            raise HTTPException(status_code=400, detail=f"Invalid file format: {file.filename}. Please upload only PDF files.")
-
-        pdf_bytes = await file.read()
-        pdf_text = extract_text_pymupdf(io.BytesIO(pdf_bytes))
-
-        # Get Gemini response for job matching
-        matched_jobs = match_jobs_with_gemini(userId, pdf_text, file.filename)
+    uploads = [(file.filename, await file.read()) for file in files]
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    start = time.perf_counter()
+
+    async def stream_results():
+        tasks = [
+            asyncio.create_task(process_uploaded_pdf(userId, filename, pdf_bytes, semaphore, batch))
+            for filename, pdf_bytes in uploads
+        ]
+        processed = failed = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if result["status"] == "ok":
+                    processed += 1
+                else:
+                    failed += 1
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        elapsed = time.perf_counter() - start
+        yield json.dumps({
+            "message": "PDFs uploaded successfully",
+            "processed": processed,
+            "failed": failed,
+            "mode": "batch" if batch else "single",
+            "elapsed_seconds": round(elapsed, 2),
+            "resumes_per_minute": round(processed / elapsed * 60, 1) if elapsed > 0 else None
+        }) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+async def process_uploaded_pdf(userId, filename, pdf_bytes, semaphore, batch=False):
+    """
+    Queue a single uploaded resume and drive it through the ingestion
+    pipeline right away. Errors are returned as part of the result instead of
+    being raised; failed items stay queued and are retried in the background,
+    and a dead item is started over.
+    """
+    if not filename.lower().endswith(".pdf"):
+        return {
+            "filename": filename,
+            "status": "error",
+            "detail": f"Invalid file format: {filename}. Please upload only PDF files."
+        }
 
-        if matched_jobs:
-            pdf_matches.insert_one({
-                "userId": userId,
-                "email": "Uploaded PDF",
-                "pdf_text": pdf_text,
-                "candidate": matched_jobs
-            })
-            candidates.insert_one({
-                "userId": userId,
-                "email": "Uploaded PDF",
-                "pdf_text": pdf_text,
-                "candidate": matched_jobs
-            })
+    async with semaphore:
+        try:
+            # ✅ Enqueued already leased to this request, so a background worker cannot take it first
+            lease_owner = ingest_worker.new_lease_owner()
+            key = await asyncio.to_thread(
+                ingest_queue.enqueue, userId, "upload", hash_pdf(pdf_bytes), pdf_bytes, "Uploaded PDF", filename, batch,
+                lease_owner, retry_dead=True
+            )
+            item = await ingest_worker.process_key(key, lease_owner)
+        except Exception as e:
+            return {"filename": filename, "status": "error", "detail": str(e)}
 
-        matched_jobs_list.append({
-            "filename": file.filename,
-            "matched_jobs": matched_jobs
-        })
+    if item["state"] != STORED:
+        # Still in the queue (retrying or being processed elsewhere) unless it has failed for good
+        status = "error" if item["state"] == DEAD or item.get("last_error") else "queued"
+        return {"filename": filename, "status": status, "state": item["state"], "detail": item.get("last_error")}
 
-    return {
-        "message": "PDFs uploaded successfully",
-        "processed_files": matched_jobs_list
-    }
+    return {"filename": filename, "status": "ok", "matched_jobs": item["candidate"]}
 
 
 
-def generate_job_post(jobpost, GEMINI_API_KEY, job_post_id):
-    GEMINI_MODEL="gemini-2.0-flash"
+async def generate_job_post(jobpost, GEMINI_API_KEY, job_post_id):
     prompt = f"""Create a job post like a pro.
     Here is the details of the job post:
     {jobpost}
@@ -704,26 +1195,7 @@ def generate_job_post(jobpost, GEMINI_API_KEY, job_post_id):
     ```
     """
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    headers = {
-        "Content-Type": "application/json",
-    }
-    data = {
-        "contents": [{
-            "parts": [{
-                "text": prompt
-            }]
-        }]
-    }
-
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-    response.raise_for_status()
-    response_json = response.json()
-    
-    generated_text = response_json["candidates"][0]["content"]["parts"][0]["text"]
-    generated_text = generated_text.replace("```json", "").replace("```", "").strip()
-    
-    generated_json_text = json.loads(generated_text)
+    generated_json_text = await generate_json(prompt, GEMINI_API_KEY)
 
     # Extract the generated job post
     online_job_platform = generated_json_text["online_job_platform"]
@@ -731,7 +1203,13 @@ def generate_job_post(jobpost, GEMINI_API_KEY, job_post_id):
     details = generated_json_text["details"]
 
     # Update in joposts db
-    jobposts.update_one({"_id": ObjectId(job_post_id)}, {"$set": {"online_job_platform": online_job_platform, "facebook_linkedin": facebook_linkedin, "details": details}})
+    await repository.jobposts.update_one({"_id": ObjectId(job_post_id)}, {"$set": {"online_job_platform": online_job_platform, "facebook_linkedin": facebook_linkedin, "details": details}})
+    await asyncio.to_thread(job_digests.refresh, job_post_id)
+
+
+# 📌 Gemini job-post content is generated in the background
+# (every status change alters the creator's home page)
+job_post_generator = JobPostGenerator(jobposts, generate_job_post, on_change=home_cache.invalidate)
 
 
 @app.get(
@@ -740,13 +1218,13 @@ def generate_job_post(jobpost, GEMINI_API_KEY, job_post_id):
     description="This endpoint can be used to get matched job posts",
     tags=["Job Post"]
 )
-def get_posts(userId: str):
-    all_posts = []
-    for post in jobposts.find({"created_by": userId}):
-        post["_id"] = str(post["_id"])
-        all_posts.append(post)
-    
-    return {"job_posts": all_posts}
+async def get_posts(userId: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None, fields: str = "summary"):
+    """
+    One page of the user's job posts. Pass the returned `next_cursor` as
+    `after` for the next page; `fields=full` includes the generated bodies.
+    """
+    cursor = keyset_find(repository.jobposts, {"created_by": userId}, "jobposts", fields, limit, after)
+    return stream_page(cursor, "job_posts", limit)
 
 @app.get(
     "/get-single_post/{userId}/{post_id}",
@@ -754,8 +1232,8 @@ def get_posts(userId: str):
     description="This endpoint can be used to get a single job post",
     tags=["Job Post"]
 )
-def get_single_post(userId: str, post_id: str):
-    post = jobposts.find_one({"_id": ObjectId(post_id)})
+async def get_single_post(userId: str, post_id: str):
+    post = await repository.get_job_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Job post not found")
     
@@ -771,14 +1249,58 @@ def get_single_post(userId: str, post_id: str):
     tags=["Job Post"]
 )
 
-def get_candidates(userId: str, job_post_id: str):
-    candidates_ = list(candidates.find({"candidate.candidate.jobpost_id": job_post_id}))
+async def get_candidates(userId: str, job_post_id: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None, fields: str = "summary"):
+    # ✅ Resume text is only returned by the single-candidate view
+    cursor = keyset_find(repository.candidates, {"candidate.candidate.jobpost_id": job_post_id}, "candidates", fields, limit, after)
+    return stream_page(cursor, "candidates", limit)
 
-    # ✅ Convert `_id` to string
-    for candidate in candidates_:
+@app.get(
+    "/search-candidates/{userId}",
+    summary="Search candidates",
+    description="Filter the user's candidates by skill, location and years of experience, with facet counts",
+    tags=["Job Post"]
+)
+async def search_candidates(
+    userId: str,
+    skills: str = None,
+    location: str = None,
+    min_experience: float = None,
+    max_experience: float = None,
+    job_post_id: str = None,
+    limit: int = 50
+):
+    """
+    `skills` is a comma-separated list; every skill must match (synonyms such
+    as "ReactJS" and "react.js" resolve to the same canonical skill).
+    """
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+
+    pipeline = search_pipeline(
+        userId,
+        skills=skills.split(",") if skills else None,
+        location=location,
+        min_experience=min_experience,
+        max_experience=max_experience,
+        job_post_id=job_post_id,
+        limit=limit
+    )
+    result = await repository.search_candidates(pipeline)
+
+    for candidate in result.get("results", []):
         candidate["_id"] = str(candidate["_id"])
 
-    return {"candidates": candidates_}
+    total = result.get("total", [])
+    return {
+        "total": total[0]["count"] if total else 0,
+        "candidates": result.get("results", []),
+        "facets": {
+            "skills": [{"skill": row["_id"], "count": row["count"]} for row in result.get("skills", [])],
+            "locations": [{"location": row["_id"], "count": row["count"]} for row in result.get("locations", [])],
+            "experience_years": [{"from": row["_id"], "count": row["count"]} for row in result.get("experience", [])]
+        }
+    }
+
 
 @app.get(
     "/get-candidate/{userId}/{candidate_id}",
@@ -786,18 +1308,21 @@ def get_candidates(userId: str, job_post_id: str):
     description="This endpoint can be used to get a single candidate",
     tags=["Job Post"]
 )
-def get_candidate(userId: str, candidate_id: str):
-
-    user_obj_id = ObjectId(userId)
+async def get_candidate(userId: str, candidate_id: str):
 
-    if not hrs.find_one({"_id": user_obj_id}):
+    # ✅ Both lookups run concurrently
+    user, candidate_ = await asyncio.gather(
+        repository.get_user(userId, {"_id": 1}),
+        repository.get_candidate(candidate_id)
+    )
+    if not user:
         raise HTTPException(status_code=404, detail="User not found")
-
-    candidate_ = candidates.find_one({"_id": ObjectId(candidate_id)})
     if not candidate_:
         raise HTTPException(status_code=404, detail="Candidate not found")
     
     candidate_["_id"] = str(candidate_["_id"])
+    if candidate_.get("resume_text_id"):
+        candidate_["pdf_text"] = await asyncio.to_thread(resume_store.get, candidate_["resume_text_id"])
     return {"candidate": candidate_}
 
 
@@ -808,117 +1333,83 @@ def get_candidate(userId: str, candidate_id: str):
     tags=["Job Post"]
 )
 
-def screen_candidate(userId: str, candidate_id: str):
+async def screen_candidate(userId: str, candidate_id: str, force: bool = False):
     """
     Screen a candidate based on their qualifications and experience.
+    The stored screening is returned while neither the candidate nor the job
+    post has changed; `force=true` always generates a new one.
     """
-    candidate = candidates.find_one({"_id": ObjectId(candidate_id)})
+    candidate = await repository.get_candidate(candidate_id)
     if not candidate:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
     job_post_id = candidate["candidate"]["candidate"]["jobpost_id"]
-    job_post = jobposts.find_one({"_id": ObjectId(job_post_id)})
+    job_post = await repository.get_job_post(job_post_id)
     if not job_post:
         raise HTTPException(status_code=404, detail="Job post not found")
 
-    screening_data = generate_screening(candidate.get("candidate", {}), job_post, userId)
+    job_hash = content_hash(job_post_profile(job_post))
+    candidate_hash = content_hash(candidate.get("candidate", {}))
+
+    # ✅ Reuse the stored screening unless either side changed
+    if force:
+        screening_cache.count_forced()
+    else:
+        cached = await screening_cache.get(userId, candidate_id, job_hash, candidate_hash)
+        if cached:
+            return {"screening_id": str(cached["_id"]), "screening": cached["screening"], "cached": True}
+
+    screening_data = await generate_screening(candidate.get("candidate", {}), job_post, userId)
 
     if not screening_data:
         raise HTTPException(status_code=500, detail="Failed to generate screening")
 
-    # ✅ Store screening in MongoDB and retrieve the inserted document's ID
-    inserted_screening = screening.insert_one({
-        "userId": userId,
-        "candidate_id": candidate_id,
-        "screening": screening_data
-    })
+    # ✅ Store screening in MongoDB, replacing the candidate's previous one
+    screening_id = await screening_cache.put(userId, candidate_id, job_hash, candidate_hash, screening_data)
 
-    screening_id = str(inserted_screening.inserted_id)
+    return {"screening_id": screening_id, "screening": screening_data, "cached": False}
 
-    return {"screening_id": screening_id, "screening": screening_data}
 
 
 
-
-def generate_ranking(candidates, job_post, userId):
+async def generate_ranking_scores(candidates_chunk, job_profile, userId):
     """
-    Generate ranking of candidates based on their skills and experience.
+    Score one chunk of candidates against a job post on an absolute 0-100 scale.
     """
-    GEMINI_API_KEY = hrs.find_one({"_id": ObjectId(userId)}).get("gemini_api_key", "")
-    GEMINI_MODEL = "gemini-2.0-flash"
-
-    # ✅ Convert MongoDB `ObjectId` to strings
-    job_post["_id"] = str(job_post["_id"])  # Ensure `_id` is serializable
+    GEMINI_API_KEY = await repository.get_gemini_api_key(userId)
 
-    candidates_serialized = []
-    for candidate_id, candidate_data in candidates:
-        candidate_data["_id"] = candidate_id  # ✅ Ensure candidate `_id` is string
-        candidates_serialized.append(candidate_data)
-
-    # ✅ Construct Prompt for Gemini
+    # ✅ Construct Prompt for Gemini (compact JSON keeps the prompt small)
     prompt = f"""
     Here is the job post and candidates' information.
     **Job Post**:
-    {json.dumps(job_post, indent=4)}
+    {json.dumps(job_profile, default=str)}
 
     **Candidates**:
-    {json.dumps(candidates_serialized, indent=4)}
+    {json.dumps(candidates_chunk, default=str)}
 
-    Generate a ranking of the candidates based on their skills and experience.
+    Score every candidate from 0 to 100 for how well their skills and experience fit the job post.
+    Use an absolute scale: the score must not depend on the other candidates in this list.
+    Return one entry per candidate, using the candidate's `_id` exactly as given.
     You should return a JSON format like below:
 
     ```json
     {{
-        "ranking": [
-            {{
-                "_id": "candidate_id",
-                "name": "John Doe",
-                "email": "john@email.com",
-                "metrics": "Reason why this candidate ranks in this position"
-            }},
+        "scores": [
             {{
                 "_id": "candidate_id",
-                "name": "Jane Doe",
-                "email": "jane@email.com",
-                "metrics": "Reason why this candidate ranks in this position"
+                "score": 87,
+                "metrics": "Reason for this score"
             }}
         ]
     }}
     ```
     """
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    headers = {"Content-Type": "application/json"}
-    data = {"contents": [{"parts": [{"text": prompt}]}]}
-
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-
-    # ✅ Error Handling
-    if response.status_code != 200:
-        print(f"Gemini API Error: {response.text}")
-        raise HTTPException(status_code=500, detail="Failed to generate ranking")
-
-    response_json = response.json()
-
-    try:
-        # ✅ Ensure response contains valid text
-        generated_text = response_json.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "").strip()
-
-        if not generated_text:
-            raise ValueError("Gemini response is empty")
-
-        # ✅ Strip extra formatting & parse JSON
-        generated_text = generated_text.replace("```json", "").replace("```", "").strip()
-        ranking_data = json.loads(generated_text)
-
-        return ranking_data.get("ranking", [])
-
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        print(f"Error parsing ranking response: {e}")
-        raise HTTPException(status_code=500, detail="Invalid response from Gemini AI")
-         
+    scores_data = await generate_json(prompt, GEMINI_API_KEY)
+    return scores_data.get("scores", [])
 
 
+ranking_engine = RankingEngine(candidate_scores, generate_ranking_scores)
 
 
 @app.get(
@@ -927,51 +1418,78 @@ def generate_ranking(candidates, job_post, userId):
     description="This endpoint ranks candidates for a specific job post.",
     tags=["Job Post"]
 )
-def ranking_candidate(userId: str, job_post_id: str):
+async def ranking_candidate(userId: str, job_post_id: str, mode: str = "full", top_k: int = None):
     """
     Rank candidates based on their qualifications and match with job post.
+
+    mode=full     Gemini ranking (of the local top_k shortlist when top_k is given)
+    mode=fast     instant local BM25 ranking, no Gemini call
+    mode=compare  both, plus latency and agreement between the two
     """
-    # ✅ Fetch candidates properly from nested structure
-    candidates_ = [
-        (str(candidate["_id"]), candidate["candidate"]["candidate"])
-        for candidate in candidates.find(
-            {"candidate.candidate.jobpost_id": job_post_id},
-            {"_id": 1, "candidate.candidate": 1}  # ✅ Fetch only required fields
-        ) if "candidate" in candidate and "candidate" in candidate["candidate"]  # ✅ Ensure nested structure exists
-    ]
+    if mode not in ("full", "fast", "compare"):
+        raise HTTPException(status_code=400, detail="mode must be one of: full, fast, compare")
+    if top_k is not None and top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+
+    # ✅ Fetch the candidates' extracted profiles and the job post concurrently
+    candidates_, job_post = await asyncio.gather(
+        repository.get_job_post_profiles(job_post_id),
+        repository.get_job_post(job_post_id)
+    )
 
     if not candidates_:
         raise HTTPException(status_code=404, detail="No candidates found for this job post")
-
-    # ✅ Fetch job post details
-    job_post = jobposts.find_one({"_id": ObjectId(job_post_id)})
     if not job_post:
         raise HTTPException(status_code=404, detail="Job post not found")
 
-    # ✅ Generate ranking
-    ranking_ = generate_ranking(candidates_, job_post, userId)
+    # ✅ Local LLM-free pre-ranking
+    local_ranking = None
+    if mode != "full" or top_k:
+        began = time.perf_counter()
+        local_ranking = prerank(job_post, candidates_)
+        local_ms = round((time.perf_counter() - began) * 1000, 2)
 
-    if not ranking_:
-        raise HTTPException(status_code=500, detail="Failed to generate ranking")
+    if mode == "fast":
+        return {"mode": "fast", "ranking": local_ranking, "latency_ms": local_ms}
 
-    # ✅ Store ranking in MongoDB and retrieve the inserted document's ID
-    inserted_ranking = ranking.insert_one({
-        "userId": userId,
-        "job_post_id": job_post_id,
-        "ranking": ranking_
-    })
+    # ✅ Only the local top_k go to Gemini
+    total_candidates = len(candidates_)
+    if top_k:
+        shortlist = {entry["_id"] for entry in local_ranking[:top_k]}
+        candidates_ = [(candidate_id, profile) for candidate_id, profile in candidates_ if candidate_id in shortlist]
+
+    # ✅ Score new / changed candidates in concurrent chunks, reuse cached scores for the rest
+    began = time.perf_counter()
+    ranking_, newly_scored = await ranking_engine.rank(job_post, candidates_, userId)
+    gemini_ms = round((time.perf_counter() - began) * 1000, 2)
 
-    ranking_id = str(inserted_ranking.inserted_id)  # ✅ Convert ObjectId to string
+    if all(entry["score"] is None for entry in ranking_):
+        raise HTTPException(status_code=500, detail="Failed to generate ranking")
 
-    return {"ranking_id": ranking_id, "ranking": ranking_}
+    # ✅ Keep one ranking document per job post, updated on every re-rank
+    ranking_id = await repository.save_ranking(userId, job_post_id, ranking_)
 
+    response = {
+        "ranking_id": ranking_id,
+        "ranking": ranking_,
+        "newly_scored": newly_scored,
+        "shortlisted": len(candidates_),
+        "total_candidates": total_candidates
+    }
+    if mode == "compare":
+        response["benchmark"] = {
+            "local_ms": local_ms,
+            "gemini_ms": gemini_ms,
+            "agreement": ranking_agreement(ranking_, local_ranking, k=top_k or 10)
+        }
+    return response
 
-def generate_screening(candidate, job_post, userId):
+
+async def generate_screening(candidate, job_post, userId):
     """
     Generate screening of candidates based on their qualifications and experience.
     """
-    GEMINI_API_KEY = hrs.find_one({"_id": ObjectId(userId)}).get("gemini_api_key", "")
-    GEMINI_MODEL = "gemini-2.0-flash"
+    GEMINI_API_KEY = await repository.get_gemini_api_key(userId)
 
 
     # ✅ Construct Prompt for Gemini
@@ -1000,38 +1518,19 @@ def generate_screening(candidate, job_post, userId):
     YOU MUST RETURN A JSON VALUE BASED ON THE JOB POST AND CANDIDATE INFO.
     """
     
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    headers = {
-        "Content-Type": "application/json",
-    }
-    data = {
-        "contents": [{
-            "parts": [{
-                "text": prompt
-            }]
-        }]
-    }
-
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-    response.raise_for_status()
-    response_json = response.json()
+    return await generate_json(prompt, GEMINI_API_KEY)
 
-    generated_text = response_json["candidates"][0]["content"]["parts"][0]["text"]
-    generated_text = generated_text.replace("```json", "").replace("```", "").strip()
-    return json.loads(generated_text)
 
 
 
 
 
 
-
-def generate_email_body(userId):
+async def generate_email_body(userId):
     """
     Generate email body for inviting a candidate to an interview.
     """
-    GEMINI_API_KEY = hrs.find_one({"_id": ObjectId(userId)}).get("gemini_api_key", "")
-    GEMINI_MODEL = "gemini-2.0-flash"
+    GEMINI_API_KEY = await repository.get_gemini_api_key(userId)
 
     # ✅ Construct Prompt for Gemini
     prompt = f"""
@@ -1046,25 +1545,7 @@ def generate_email_body(userId):
     ```
     """
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    headers = {
-        "Content-Type": "application/json",
-    }
-    data = {
-        "contents": [{
-            "parts": [{
-                "text": prompt
-            }]
-        }]
-    }
-
-    response = requests.post(url, headers=headers, data=json.dumps(data))
-    response.raise_for_status()
-    response_json = response.json()
-
-    generated_text = response_json["candidates"][0]["content"]["parts"][0]["text"]
-    generated_text = generated_text.replace("```json", "").replace("```", "").strip()
-    return json.loads(generated_text)
+    return await generate_json(prompt, GEMINI_API_KEY)
 
 
 from email.utils import formataddr
@@ -1075,12 +1556,12 @@ from email.utils import formataddr
     description="This endpoint can be used to invite a candidate for an interview",
     tags=["Job Post"]
 )
-def invite_interview(userId: str, candidate_id: str):
+async def invite_interview(userId: str, candidate_id: str):
     """
     Invite a candidate for an interview by generating an email body.
     """
     # ✅ Fetch candidate document from MongoDB
-    candidate_ = candidates.find_one({"_id": ObjectId(candidate_id)})
+    candidate_ = await repository.get_candidate(candidate_id)
     if not candidate_:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
@@ -1092,7 +1573,7 @@ def invite_interview(userId: str, candidate_id: str):
     # ✅ Generate Email Body
 
     job_post_id = candidate_["candidate"]["candidate"]["jobpost_id"]
-    job_post = jobposts.find_one({"_id": ObjectId(job_post_id)})
+    job_post = await repository.get_job_post(job_post_id, {"job_title": 1})
     job_title = job_post.get("job_title", "Job Title")
     
     email_body = f"""
@@ -1110,10 +1591,6 @@ def invite_interview(userId: str, candidate_id: str):
 
     userId = "67d07897c1fcab866c006ba3"
 
-    # ✅ Get Gmail Credentials
-    creds = get_credentials(userId)
-    service = build("gmail", "v1", credentials=creds)
-    
     # ✅ Create and Format Email Message
     message = MIMEText(email_body)
     message["to"] = formataddr(("Candidate", email_address))  # Ensure Proper Email Formatting
@@ -1124,8 +1601,13 @@ def invite_interview(userId: str, candidate_id: str):
     
     # ✅ Send Email
     try:
-        sent_message = service.users().messages().send(userId="me", body=send_request).execute()
+        sent_message = await asyncio.to_thread(
+            execute_google_request, userId, "gmail", "v1",
+            lambda service: service.users().messages().send(userId="me", body=send_request)
+        )
         return {"message": "Email sent!", "Message ID": sent_message['id'], "email_body": email_body}
+    except HTTPException:
+        raise  # e.g. no Gmail credentials
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
@@ -1135,66 +1617,111 @@ class SlotCreateRequest(BaseModel):
     start_times: List[str] = Field(..., example=["2025-04-10T10:00:00", "2025-04-10T11:00:00"])
     duration: int = Field(default=60, example=60)
 
+
+class SlotRecurrenceRequest(BaseModel):
+    start_date: str = Field(..., example="2025-04-07")
+    end_date: str = Field(..., example="2025-04-18")
+    weekdays: List[str] = Field(default=["mon", "tue", "wed", "thu", "fri"], example=["mon", "wed", "fri"])
+    day_start: str = Field(default="10:00", example="10:00")
+    day_end: str = Field(default="16:00", example="16:00")
+    duration: int = Field(default=60, example=60)
+    gap: int = Field(default=0, example=15)
+    timezone: str = Field(default="UTC", example="Asia/Dhaka")
+    # Leave out the slots that overlap existing ones instead of rejecting the request
+    skip_conflicts: bool = False
+
+
+async def insert_slots(userId, times, skip_conflicts=False):
+    """
+    Check (start, end) UTC times for overlaps with each other and the user's
+    existing slots, then store them with a single insert_many.
+    """
+    if not times:
+        return {"message": "No slots to create.", "created": 0, "skipped": [], "slots": []}
+    if len(times) > MAX_SLOTS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SLOTS_PER_REQUEST} slots per request")
+    past = [start for start, _ in times if start < datetime.utcnow()]
+    if past:
+        raise HTTPException(status_code=400, detail=f"Slots cannot start in the past: {slot_json(min(past))}")
+
+    # ✅ Overlap check and insert run under the interviewer's lock, so concurrent requests cannot overlap
+    async with slot_index.lock(userId):
+        conflicts = await slot_index.find_conflicts(userId, times)
+        if conflicts and not skip_conflicts:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Slots overlap existing or requested slots",
+                        "conflicts": [slot_json(start) for start, _ in conflicts]}
+            )
+
+        skipped = set(conflicts)
+        documents = [slot_document(userId, start, end) for start, end in times if (start, end) not in skipped]
+        await repository.insert_slots(documents)
+        await slot_index.add(userId, documents)
+
+    for slot in documents:
+        slot["_id"] = str(slot["_id"])  # ✅ Convert ObjectId to string before returning
+        slot["start_time"], slot["end_time"] = slot_json(slot["start_time"]), slot_json(slot["end_time"])
+
+    return {
+        "message": "Slots created!",
+        "created": len(documents),
+        "skipped": [slot_json(start) for start, _ in sorted(skipped)],
+        "slots": documents,
+    }
+
+
 @app.post(
     "/users/{userId}/create-slots/",
     summary="Create available interview slots",
     description="This endpoint creates available interview slots.",
     tags=["Job Post"]
 )
-def create_slots(userId: str, slot_data: SlotCreateRequest):
+async def create_slots(userId: str, slot_data: SlotCreateRequest):
     """
     The interviewer creates available slots. Candidates can later book these slots.
     """
-    slots = []
+    if slot_data.duration <= 0:
+        raise HTTPException(status_code=400, detail="duration must be positive")
+
+    times = []
     for start_time in slot_data.start_times:
         try:
-            start = datetime.fromisoformat(start_time)
-            end = start + timedelta(minutes=slot_data.duration)
-
-            slot = {
-                "userId": str(userId),  # ✅ Convert userId to string
-                "start_time": start.isoformat(),
-                "end_time": end.isoformat(),
-                "available": True
-            }
-            
-            inserted_id = SLOTS_DB.insert_one(slot).inserted_id  # ✅ Store ObjectId
-            slot["_id"] = str(inserted_id)  # ✅ Convert ObjectId to string before returning
-
-            slots.append(slot)
-
+            start = to_utc(start_time)
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Invalid date format: {start_time}")
+        times.append((start, start + timedelta(minutes=slot_data.duration)))
 
-    return {"message": "Slots created!", "slots": slots}
+    return await insert_slots(userId, times)
 
-class BookSlotRequest(BaseModel):
-    candidate_email: str
-    selected_start_time: str
 
 @app.post(
-    "/users/{userId}/book-slot/",
-    summary="Book an interview slot",
-    description="This endpoint allows candidates to book an interview slot.",
+    "/users/{userId}/create-recurring-slots/",
+    summary="Create recurring interview slots",
+    description="Creates back-to-back slots on the given weekdays between day_start and day_end, "
+                "e.g. weekdays 10:00-16:00 for two weeks.",
     tags=["Job Post"]
 )
-def book_slot(userId: str, slot_data: BookSlotRequest):
-    """
-    Any candidate can book a slot from the available interview slots.
-    """
-    print(f"Booking slot for userId: {userId} at {slot_data.selected_start_time}")
+async def create_recurring_slots(userId: str, rule: SlotRecurrenceRequest):
+    try:
+        times = expand_recurrence(rule.start_date, rule.end_date, rule.weekdays, rule.day_start,
+                                  rule.day_end, rule.duration, rule.gap, rule.timezone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    creds = get_credentials(userId)
-    service = build("calendar", "v3", credentials=creds)
+    return await insert_slots(userId, times, rule.skip_conflicts)
 
-    # ✅ Query MongoDB for an available slot
-    slot = SLOTS_DB.find_one({"userId": userId, "start_time": slot_data.selected_start_time, "available": True})
 
-    if not slot:
-        raise HTTPException(status_code=404, detail="Selected slot is not available or already booked.")
+class BookSlotRequest(BaseModel):
+    candidate_email: str
+    selected_start_time: str
 
-    start = datetime.fromisoformat(slot["start_time"])
-    end = datetime.fromisoformat(slot["end_time"])
+
+async def create_interview_event(userId, slot, candidate_email):
+    """
+    Create the Calendar event with a Google Meet link for a claimed slot; returns (event, meet_link).
+    """
+    start, end = slot["start_time"], slot["end_time"]
 
     # ✅ Generate unique Google Meet link
     event = {
@@ -1202,18 +1729,19 @@ def book_slot(userId: str, slot_data: BookSlotRequest):
         "description": "Scheduled interview via API",
         "start": {"dateTime": start.isoformat(), "timeZone": "UTC"},
         "end": {"dateTime": end.isoformat(), "timeZone": "UTC"},
-        "attendees": [{"email": slot_data.candidate_email}],
+        "attendees": [{"email": candidate_email}],
         "conferenceData": {
             "createRequest": {
                 "conferenceSolutionKey": {"type": "hangoutsMeet"},
-                "requestId": f"meet-{int(start.timestamp())}"
+                "requestId": f"meet-{slot['_id']}"
             }
         }
     }
 
-    created_event = service.events().insert(
-        calendarId="primary", body=event, conferenceDataVersion=1
-    ).execute()
+    created_event = await asyncio.to_thread(
+        execute_google_request, userId, "calendar", "v3",
+        lambda service: service.events().insert(calendarId="primary", body=event, conferenceDataVersion=1)
+    )
 
     # ✅ Extract Google Meet link
     meet_link = None
@@ -1226,11 +1754,45 @@ def book_slot(userId: str, slot_data: BookSlotRequest):
     if not meet_link:
         meet_link = "Google Meet link not available"
 
+    return created_event, meet_link
+
+@app.post(
+    "/users/{userId}/book-slot/",
+    summary="Book an interview slot",
+    description="This endpoint allows candidates to book an interview slot.",
+    tags=["Job Post"]
+)
+async def book_slot(userId: str, slot_data: BookSlotRequest):
+    """
+    Any candidate can book a slot from the available interview slots.
+    """
+    print(f"Booking slot for userId: {userId} at {slot_data.selected_start_time}")
+
+    try:
+        start_time = to_utc(slot_data.selected_start_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {slot_data.selected_start_time}")
+
+    # ✅ Claim the slot atomically, before any external call, so it cannot be booked twice
+    slot = await repository.claim_slot(userId, start_time, slot_data.candidate_email)
+    if not slot:
+        raise HTTPException(status_code=409, detail="Selected slot is not available or already booked.")
+    await slot_index.take(userId, slot)
+
+    try:
+        created_event, meet_link = await create_interview_event(userId, slot, slot_data.candidate_email)
+    except (Exception, asyncio.CancelledError) as e:
+        # ✅ Give the slot back if the calendar event could not be created
+        await repository.release_slot(slot["_id"], slot_data.candidate_email)
+        await slot_index.give_back(userId, slot)
+        if not isinstance(e, Exception) or isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=502, detail=f"Failed to create the calendar event: {str(e)}")
+
     # ✅ Update MongoDB slot as booked
-    SLOTS_DB.update_one(
-        {"_id": slot["_id"]},
-        {"$set": {"available": False, "candidate_email": slot_data.candidate_email, "meet_link": meet_link}}
-    )
+    await repository.mark_slot_booked(slot["_id"], meet_link, created_event["id"])
+
+    start, end = slot["start_time"], slot["end_time"]
 
     # ✅ Send email to interviewer that slot is booked
     email_body = f"""
@@ -1245,7 +1807,7 @@ def book_slot(userId: str, slot_data: BookSlotRequest):
     """
 
     # ✅ Get Interviewer's Email
-    interviewer = hrs.find_one({"_id": ObjectId(userId)})
+    interviewer = await repository.get_user(userId, {"email": 1})
     if not interviewer:
         raise HTTPException(status_code=404, detail="Interviewer not found.")
 
@@ -1256,8 +1818,6 @@ def book_slot(userId: str, slot_data: BookSlotRequest):
     # ✅ Send Email
     try:
         userId = "67d018b407a307a21390ede1"
-        creds = get_credentials(userId)
-        service = build("gmail", "v1", credentials=creds)
 
         message = MIMEText(email_body)
         message["to"] = to_mail
@@ -1265,7 +1825,10 @@ def book_slot(userId: str, slot_data: BookSlotRequest):
         encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
 
         send_request = {"raw": encoded_message}
-        service.users().messages().send(userId="me", body=send_request).execute()
+        await asyncio.to_thread(
+            execute_google_request, userId, "gmail", "v1",
+            lambda service: service.users().messages().send(userId="me", body=send_request)
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
@@ -1283,19 +1846,47 @@ def book_slot(userId: str, slot_data: BookSlotRequest):
     description="This endpoint returns all available interview slots for a given user.",
     tags=["Job Post"]
 )
-def get_available_slots(userId: str):
+async def get_available_slots(userId: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None, fields: str = "full",
+                              from_: str = Query(None, alias="from"), to: str = None):
     """
-    Fetches all available interview slots for a specific user.
+    Fetches the upcoming available interview slots for a specific user in start
+    time order, one page at a time; `from`/`to` (ISO datetimes) narrow it to a date range.
     """
     print(f"Fetching available slots for userId: {userId}")
 
-    slots = list(SLOTS_DB.find({"userId": userId, "available": True}))
+    try:
+        # ✅ Past slots are never offered
+        start_range = {"$gte": max(to_utc(from_), datetime.utcnow()) if from_ else datetime.utcnow()}
+        if to:
+            start_range["$lt"] = to_utc(to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format for from/to")
+
+    # ✅ Soonest slots first; the cursor carries (start_time, _id) of the last slot
+    query = {"userId": userId, "available": True, "start_time": start_range}
+    cursor = keyset_find(repository.slots, query, "slots", fields, limit, after, "start_time", to_utc)
+    return stream_page(cursor, "slots", limit, default=slot_json, next_cursor=sort_cursor("start_time", slot_json))
+
 
-    # ✅ Convert ObjectId to string before returning
-    for slot in slots:
-        slot["_id"] = str(slot["_id"])
+@app.get(
+    "/users/{userId}/next-free-slots/",
+    summary="Next free interview slots",
+    description="The next n open slots of the interviewer, from the in-memory slot index.",
+    tags=["Job Post"]
+)
+async def get_next_free_slots(userId: str, n: int = 5, after: str = None):
+    if n < 1 or n > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"n must be between 1 and {MAX_PAGE_SIZE}")
+    try:
+        after_time = to_utc(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {after}")
 
-    return {"slots": slots}
+    slots = await slot_index.next_free(userId, n, after_time)
+    return {"slots": [
+        {"_id": str(slot_id), "start_time": slot_json(start), "end_time": slot_json(end), "available": True}
+        for start, end, slot_id in slots
+    ]}
 
 
 
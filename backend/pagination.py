@@ -0,0 +1,146 @@
+import os
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from job_digest import DIGEST_EXCLUDED
+
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Selectable field sets per collection (a Mongo projection, None = every field)
+FIELD_SETS = {
+    "jobposts": {
+        # Leaves out the large Gemini-generated bodies; the matching digest is internal
+        "summary": {"online_job_platform": 0, "facebook_linkedin": 0, "details": 0, **DIGEST_EXCLUDED},
+        "full": DIGEST_EXCLUDED,
+    },
+    "candidates": {
+        "summary": {"pdf_text": 0},
+        "profile": {"userId": 1, "email": 1, "candidate": 1},
+        "full": None,
+    },
+    "slots": {
+        "summary": {"start_time": 1, "end_time": 1, "available": 1},
+        "full": None,
+    },
+}
+
+
+def resolve_projection(collection_name, fields):
+    field_sets = FIELD_SETS[collection_name]
+    if fields not in field_sets:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid fields '{fields}'. Choose one of: {', '.join(field_sets)}"
+        )
+    return field_sets[fields]
+
+
+def keyset_find(collection, query, collection_name, fields, limit, after, sort_field=None, parse_value=None):
+    """
+    One page of `query` in `_id` order, starting after the `_id` in `after`.
+    With `sort_field` the page is in (sort_field, _id) order instead and
+    `after` is a "<value>,<_id>" cursor (see sort_cursor); `parse_value`
+    turns the value back into what is stored. The sort needs an index ending
+    in (sort_field, _id).
+    Fetches limit + 1 documents so the caller can tell whether there is a next page.
+    """
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    query = dict(query)
+    if after:
+        try:
+            if sort_field:
+                value, last_id = after.rsplit(",", 1)
+                value, last_id = (parse_value or str)(value), ObjectId(last_id)
+                query["$or"] = [
+                    {sort_field: {"$gt": value}},
+                    {sort_field: value, "_id": {"$gt": last_id}},
+                ]
+            else:
+                query["_id"] = {"$gt": ObjectId(after)}
+        except (InvalidId, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {after}")
+
+    projection = resolve_projection(collection_name, fields)
+    sort = [(sort_field, 1), ("_id", 1)] if sort_field else [("_id", 1)]
+    return collection.find(query, projection).sort(sort).limit(limit + 1)
+
+
+def sort_cursor(sort_field, default=str):
+    """
+    `next_cursor` function for pages from keyset_find(..., sort_field=...).
+    """
+    return lambda doc: f"{default(doc[sort_field])},{doc['_id']}"
+
+
+def _head(key, extra, default):
+    return json.dumps(extra or {}, default=default)[:-1] + (", " if extra else "") + json.dumps(key) + ": ["
+
+
+def _tail(last_id, has_more):
+    return '], "next_cursor": ' + json.dumps(last_id if has_more else None) + "}"
+
+
+def _iter_page(cursor, key, limit, extra, default, next_cursor):
+    yield _head(key, extra, default)
+    count = 0
+    last_id = None
+    has_more = False
+    try:
+        for doc in cursor:
+            if count == limit:
+                has_more = True
+                break
+            doc["_id"] = str(doc["_id"])
+            last_id = next_cursor(doc) if next_cursor else doc["_id"]
+            yield ("," if count else "") + json.dumps(doc, default=default)
+            count += 1
+    finally:
+        cursor.close()
+    yield _tail(last_id, has_more)
+
+
+async def _aiter_page(cursor, key, limit, extra, default, next_cursor):
+    yield _head(key, extra, default)
+    count = 0
+    last_id = None
+    has_more = False
+    try:
+        async for doc in cursor:
+            if count == limit:
+                has_more = True
+                break
+            doc["_id"] = str(doc["_id"])
+            last_id = next_cursor(doc) if next_cursor else doc["_id"]
+            yield ("," if count else "") + json.dumps(doc, default=default)
+            count += 1
+    finally:
+        await cursor.close()
+    yield _tail(last_id, has_more)
+
+
+def stream_page(cursor, key, limit, extra=None, default=str, next_cursor=None):
+    """
+    Stream `{**extra, key: [...], "next_cursor": ...}` straight from the Mongo
+    cursor instead of building the list in memory. Works with both pymongo and
+    async (Motor) cursors. `default` encodes values JSON cannot (e.g. datetimes).
+    `next_cursor(doc)` makes the cursor from the last document (default: its `_id`).
+    """
+    if hasattr(cursor, "__aiter__"):
+        body = _aiter_page(cursor, key, limit, extra, default, next_cursor)
+    else:
+        body = _iter_page(cursor, key, limit, extra, default, next_cursor)
+    return StreamingResponse(body, media_type="application/json")
+
+
+async def render_page(cursor, key, limit, extra=None, default=str, next_cursor=None):
+    """
+    The same page as stream_page, rendered into one string (for caching).
+    """
+    return "".join([chunk async for chunk in _aiter_page(cursor, key, limit, extra, default, next_cursor)])
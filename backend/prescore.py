@@ -0,0 +1,133 @@
+"""
+Local, LLM-free BM25 scoring of candidates against a job post.
+
+Used as the "fast" ranking mode and to shortlist the top-k candidates before
+they are sent to Gemini.
+"""
+import re
+import numpy as np
+
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+CANDIDATE_FIELDS = ["skills", "experience", "projects", "education"]
+JOB_POST_FIELDS = ["job_title", "job_description", "details"]
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def _flatten(value):
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(_flatten(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_flatten(v) for v in value)
+    return str(value)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def candidate_tokens(profile):
+    return tokenize(" ".join(_flatten(profile.get(field)) for field in CANDIDATE_FIELDS))
+
+
+def job_post_tokens(job_post):
+    return tokenize(" ".join(_flatten(job_post.get(field)) for field in JOB_POST_FIELDS))
+
+
+def bm25_scores(query_tokens, docs_tokens, k1=BM25_K1, b=BM25_B):
+    """
+    BM25 score of every document for the query, computed on a dense
+    (documents x query terms) term-frequency matrix. Only query terms can
+    contribute to the score, so the matrix stays narrow.
+    Returns (scores, terms, tf).
+    """
+    terms, query_counts = np.unique(np.array(query_tokens, dtype=object), return_counts=True)
+    terms = list(terms)
+    column = {term: i for i, term in enumerate(terms)}
+
+    tf = np.zeros((len(docs_tokens), len(terms)), dtype=np.float32)
+    for row, tokens in enumerate(docs_tokens):
+        for token in tokens:
+            col = column.get(token)
+            if col is not None:
+                tf[row, col] += 1
+
+    doc_len = np.array([len(tokens) for tokens in docs_tokens], dtype=np.float32)
+    avg_len = doc_len.mean() if len(doc_len) and doc_len.mean() > 0 else 1.0
+
+    n_docs = len(docs_tokens)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+
+    norm = k1 * (1 - b + b * doc_len / avg_len)
+    weights = tf * (k1 + 1) / (tf + norm[:, None])
+    return weights @ (idf * query_counts), terms, tf
+
+
+def prerank(job_post, candidates_, explain_terms=5):
+    """
+    Rank (candidate_id, profile) pairs against `job_post`, best first.
+    Scores are scaled to 0-100 relative to the best candidate.
+    """
+    if not candidates_:
+        return []
+
+    query = job_post_tokens(job_post)
+    docs = [candidate_tokens(profile) for _, profile in candidates_]
+    if not query:
+        scores, terms, tf = np.zeros(len(docs), dtype=np.float32), [], np.zeros((len(docs), 0))
+    else:
+        scores, terms, tf = bm25_scores(query, docs)
+
+    top = scores.max() if len(scores) else 0
+    scaled = scores / top * 100 if top > 0 else scores
+    order = np.argsort(-scaled, kind="stable")
+
+    ranking_ = []
+    for row in order:
+        candidate_id, profile = candidates_[row]
+        matched = [terms[col] for col in np.argsort(-tf[row])[:explain_terms] if tf[row, col] > 0]
+        ranking_.append({
+            "_id": candidate_id,
+            "name": profile.get("name", ""),
+            "email": profile.get("email", ""),
+            "score": round(float(scaled[row]), 1),
+            "metrics": f"Local match on: {', '.join(matched)}" if matched else "No matching terms",
+        })
+    return ranking_
+
+
+def ranking_agreement(reference, other, k=10):
+    """
+    Compare two rankings (lists of entries with `_id`) over their common
+    candidates: Spearman rank correlation and overlap of the top k.
+    """
+    reference_ids = [entry["_id"] for entry in reference]
+    other_ids = [entry["_id"] for entry in other]
+    other_set = set(other_ids)
+    common = [candidate_id for candidate_id in reference_ids if candidate_id in other_set]
+
+    result = {"compared": len(common), "spearman": None, "top_k": k, "top_k_overlap": None}
+    if not common:
+        return result
+
+    common_set = set(common)
+    reference_order = [c for c in reference_ids if c in common_set]
+    other_order = [c for c in other_ids if c in common_set]
+
+    n = len(common)
+    if n > 1:
+        other_rank = {candidate_id: i for i, candidate_id in enumerate(other_order)}
+        a = np.arange(n, dtype=np.float64)
+        b = np.array([other_rank[c] for c in reference_order], dtype=np.float64)
+        result["spearman"] = round(float(1 - 6 * np.sum((a - b) ** 2) / (n * (n * n - 1))), 4)
+
+    k = min(k, n)
+    result["top_k"] = k
+    result["top_k_overlap"] = round(len(set(reference_order[:k]) & set(other_order[:k])) / k, 4)
+    return result
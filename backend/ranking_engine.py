@@ -0,0 +1,143 @@
+import os
+import json
+import asyncio
+import hashlib
+from datetime import datetime
+from pymongo import UpdateOne
+
+
+RANKING_CHUNK_SIZE = int(os.getenv("RANKING_CHUNK_SIZE", "20"))
+RANKING_CONCURRENCY = int(os.getenv("RANKING_CONCURRENCY", "4"))
+
+# Job-post fields that decide a candidate's score; edits to them invalidate cached scores
+JOB_POST_SCORING_FIELDS = ["job_title", "job_description", "job_location", "job_type",
+                           "job_category", "job_salary", "details"]
+
+
+def content_hash(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def job_post_profile(job_post):
+    """
+    The part of a job post that is sent to the scorer.
+    """
+    return {field: job_post.get(field) for field in JOB_POST_SCORING_FIELDS if job_post.get(field) is not None}
+
+
+class RankingEngine:
+    """
+    Ranks a job post's candidates by scoring them in fixed-size chunks.
+
+    `score_chunk(chunk, job_profile, userId)` is an async function that receives a
+    list of candidate profiles (each with its `_id`) and returns a list of
+    {"_id", "score", "metrics"} with an absolute 0-100 score, so chunks scored
+    independently can be merged into one global order.
+
+    Scores are cached per (job post, candidate) in `scores_collection` together
+    with a hash of both sides, so re-ranking only scores new or changed candidates.
+    """
+
+    def __init__(self, scores_collection, score_chunk,
+                 chunk_size=RANKING_CHUNK_SIZE, concurrency=RANKING_CONCURRENCY):
+        self.scores = scores_collection
+        self.score_chunk = score_chunk
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+
+    def _cached_scores(self, job_post_id, job_hash, candidate_hashes):
+        cached = {}
+        for doc in self.scores.find({"job_post_id": job_post_id, "job_hash": job_hash}):
+            if candidate_hashes.get(doc["candidate_id"]) == doc["candidate_hash"]:
+                cached[doc["candidate_id"]] = doc
+        return cached
+
+    def _save_scores(self, job_post_id, job_hash, scored, candidate_hashes):
+        if not scored:
+            return
+        now = datetime.utcnow()
+        self.scores.bulk_write([
+            UpdateOne(
+                {"_id": f"{job_post_id}:{entry['_id']}"},
+                {"$set": {
+                    "job_post_id": job_post_id,
+                    "candidate_id": entry["_id"],
+                    "job_hash": job_hash,
+                    "candidate_hash": candidate_hashes[entry["_id"]],
+                    "score": entry["score"],
+                    "metrics": entry["metrics"],
+                    "scored_at": now,
+                }},
+                upsert=True,
+            )
+            for entry in scored
+        ], ordered=False)
+
+    async def _score_chunks(self, pending, job_profile, userId):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+
+        async def run(chunk):
+            async with semaphore:
+                try:
+                    return chunk, await self.score_chunk(chunk, job_profile, userId)
+                except Exception as e:
+                    # A failed chunk only leaves its own candidates unscored
+                    print(f"Ranking chunk of {len(chunk)} candidates failed: {e}")
+                    return chunk, []
+
+        scored = {}
+        for chunk, results in await asyncio.gather(*(run(chunk) for chunk in chunks)):
+            ids = {candidate["_id"] for candidate in chunk}
+            for entry in results or []:
+                candidate_id = str(entry.get("_id", ""))
+                if candidate_id not in ids:
+                    continue  # ignore ids the model made up
+                try:
+                    score = float(entry.get("score"))
+                except (TypeError, ValueError):
+                    continue
+                scored[candidate_id] = {
+                    "_id": candidate_id,
+                    "score": max(0.0, min(score, 100.0)),
+                    "metrics": entry.get("metrics", ""),
+                }
+        return scored
+
+    async def rank(self, job_post, candidates_, userId):
+        """
+        `candidates_` is a list of (candidate_id, candidate_profile).
+        Returns the merged ranking, best first, and how many candidates were newly scored.
+        """
+        job_post_id = str(job_post["_id"])
+        job_profile = job_post_profile(job_post)
+        job_hash = content_hash(job_profile)
+        profiles = {candidate_id: profile for candidate_id, profile in candidates_}
+        candidate_hashes = {candidate_id: content_hash(profile) for candidate_id, profile in candidates_}
+
+        cached = await asyncio.to_thread(self._cached_scores, job_post_id, job_hash, candidate_hashes)
+        pending = [{**profile, "_id": candidate_id}
+                   for candidate_id, profile in candidates_ if candidate_id not in cached]
+
+        scored = await self._score_chunks(pending, job_profile, userId) if pending else {}
+
+        # One retry for candidates that a failed or incomplete chunk left out
+        missing = [candidate for candidate in pending if candidate["_id"] not in scored]
+        if missing:
+            scored.update(await self._score_chunks(missing, job_profile, userId))
+
+        await asyncio.to_thread(self._save_scores, job_post_id, job_hash, list(scored.values()), candidate_hashes)
+
+        ranking_ = []
+        for candidate_id, profile in profiles.items():
+            entry = scored.get(candidate_id) or cached.get(candidate_id)
+            ranking_.append({
+                "_id": candidate_id,
+                "name": profile.get("name", ""),
+                "email": profile.get("email", ""),
+                "score": entry["score"] if entry else None,
+                "metrics": entry["metrics"] if entry else "Not scored",
+            })
+
+        ranking_.sort(key=lambda entry: entry["score"] if entry["score"] is not None else -1, reverse=True)
+        return ranking_, len(scored)
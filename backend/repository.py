@@ -0,0 +1,123 @@
+"""
+Async (Motor) data access for the request handlers.
+
+Handlers that await these methods give the event loop back while MongoDB
+works, instead of each holding one of Starlette's threadpool threads for the
+duration of their blocking pymongo calls. The background threads (mailbox
+scheduler, migrations) keep using the synchronous pymongo collections.
+"""
+import os
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from job_digest import DIGEST_EXCLUDED
+
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+
+
+class Repository:
+    def __init__(self, mongo_uri, db_name="hr_management_system"):
+        self.client = AsyncIOMotorClient(mongo_uri, maxPoolSize=MONGO_MAX_POOL_SIZE)
+        db = self.client[db_name]
+        self.hrs = db["hrs"]
+        self.jobposts = db["jobposts"]
+        self.candidates = db["candidates"]
+        self.screening = db["screening"]
+        self.ranking = db["ranking"]
+        self.slots = db["slots"]
+
+    def close(self):
+        self.client.close()
+
+    # 📌 HR users
+    async def get_user(self, userId, projection=None):
+        return await self.hrs.find_one({"_id": ObjectId(userId)}, projection)
+
+    async def get_gemini_api_key(self, userId):
+        user = await self.get_user(userId, {"gemini_api_key": 1})
+        return (user or {}).get("gemini_api_key", "")
+
+    async def set_gemini_api_key(self, userId, gemini_api_key):
+        await self.hrs.update_one({"_id": ObjectId(userId)}, {"$set": {"gemini_api_key": gemini_api_key}})
+
+    # 📌 Job posts
+    async def get_job_post(self, job_post_id, projection=DIGEST_EXCLUDED):
+        """
+        The job post, by default without the matching digest (only job_digest.py reads it).
+        """
+        return await self.jobposts.find_one({"_id": ObjectId(job_post_id)}, projection)
+
+    # 📌 Candidates
+    async def get_candidate(self, candidate_id, projection=None):
+        return await self.candidates.find_one({"_id": ObjectId(candidate_id)}, projection)
+
+    async def get_job_post_profiles(self, job_post_id):
+        """
+        (candidate_id, extracted profile) of every candidate matched to the job post.
+        """
+        cursor = self.candidates.find(
+            {"candidate.candidate.jobpost_id": job_post_id},
+            {"_id": 1, "candidate.candidate": 1}
+        )
+        return [
+            (str(candidate["_id"]), candidate["candidate"]["candidate"])
+            async for candidate in cursor
+            if "candidate" in candidate and "candidate" in candidate["candidate"]
+        ]
+
+    async def search_candidates(self, pipeline):
+        async for result in self.candidates.aggregate(pipeline):
+            return result
+        return {}
+
+    # 📌 Rankings
+    async def save_ranking(self, userId, job_post_id, ranking_):
+        """
+        Upsert the single ranking document of a job post and return its id.
+        """
+        stored = await self.ranking.find_one_and_update(
+            {"userId": userId, "job_post_id": job_post_id},
+            {"$set": {"ranking": ranking_, "updated_at": datetime.utcnow()}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return str(stored["_id"])
+
+    # 📌 Interview slots
+    async def insert_slots(self, slots):
+        """
+        Insert all slots with one insert_many; sets their `_id`s.
+        """
+        if slots:
+            await self.slots.insert_many(slots)
+        return slots
+
+    async def claim_slot(self, userId, start_time, candidate_email):
+        """
+        Atomically take an open slot for the candidate; None if there is none
+        (or another booking claimed it first).
+        """
+        return await self.slots.find_one_and_update(
+            {"userId": userId, "start_time": start_time, "available": True},
+            {"$set": {"available": False, "candidate_email": candidate_email, "claimed_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def release_slot(self, slot_id, candidate_email):
+        """
+        Reopen a claimed slot whose booking could not be completed.
+        """
+        await self.slots.update_one(
+            {"_id": slot_id, "candidate_email": candidate_email, "meet_link": {"$exists": False}},
+            {"$set": {"available": True}, "$unset": {"candidate_email": "", "claimed_at": ""}}
+        )
+
+    async def mark_slot_booked(self, slot_id, meet_link, event_id):
+        await self.slots.update_one(
+            {"_id": slot_id},
+            {"$set": {"meet_link": meet_link, "event_id": event_id, "booked_at": datetime.utcnow()}}
+        )
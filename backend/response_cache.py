@@ -0,0 +1,101 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+HOME_CACHE_SIZE = int(os.getenv("HOME_CACHE_SIZE", "1024"))
+# Upper bound on staleness for writes this process does not see (e.g. another worker)
+HOME_CACHE_TTL = float(os.getenv("HOME_CACHE_TTL", "300"))
+
+
+def make_etag(body):
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    True when an If-None-Match header value matches `etag` (also accepts a
+    list of tags, weak tags and "*").
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseCache:
+    """
+    In-process LRU cache of rendered per-user responses, keyed on
+    (userId, variant) where the variant holds the query parameters.
+
+    invalidate(userId) drops every cached variant of that user; call it after
+    any write that changes what the user's page shows. A response rendered
+    while an invalidation happened is not cached (see generation()).
+    """
+
+    def __init__(self, maxsize=HOME_CACHE_SIZE, ttl=HOME_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get(self, userId, variant):
+        """
+        The cached (etag, body), or None.
+        """
+        key = (userId, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[2] < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0], entry[1]
+            self._entries.pop(key, None)
+            self.stats["misses"] += 1
+            return None
+
+    def generation(self, userId):
+        """
+        Take this before reading the data a response is rendered from, and pass it to put().
+        """
+        with self._lock:
+            return self._generations.get(userId, 0)
+
+    def put(self, userId, variant, body, generation):
+        etag = make_etag(body)
+        with self._lock:
+            if self._generations.get(userId, 0) != generation:
+                return etag  # invalidated while rendering
+            self._entries[(userId, variant)] = (etag, body, time.monotonic())
+            self._entries.move_to_end((userId, variant))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, userId):
+        if not userId:
+            return
+        with self._lock:
+            self._generations[userId] = self._generations.get(userId, 0) + 1
+            for key in [key for key in self._entries if key[0] == userId]:
+                del self._entries[key]
+            self.stats["invalidations"] += 1
+
+    def count_not_modified(self):
+        self._count("not_modified")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,140 @@
+"""
+Micro-batching of resume matching.
+
+Resumes of the same HR user that are matched at about the same time (a bulk
+upload) are packed into one Gemini request with a shared job-post context.
+The response is split back per resume and validated; any resume whose part
+is missing or invalid falls back to its own single-resume request.
+"""
+import os
+import time
+import asyncio
+import threading
+
+
+MATCH_BATCH_SIZE = int(os.getenv("MATCH_BATCH_SIZE", "5"))
+MATCH_BATCH_WAIT = float(os.getenv("MATCH_BATCH_WAIT", "0.5"))
+
+
+def split_batch_response(response, resumes, job_post_ids):
+    """
+    Split a batch response {"results": [{"resume_index": i, "candidate": {...}}]}
+    into one {"candidate": {...}} per resume, in order. An entry is None when
+    its part is missing, duplicated, names an unknown job post, or carries an
+    email address that is not in that resume's text (a sign the model mixed
+    up two resumes).
+    """
+    results = [None] * len(resumes)
+    entries = response.get("results") if isinstance(response, dict) else None
+    if not isinstance(entries, list):
+        return results
+
+    seen = set()
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("candidate"), dict):
+            continue
+        try:
+            index = int(entry.get("resume_index"))
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= index < len(resumes):
+            continue
+        if index in seen:
+            results[index] = None  # two answers for one resume: trust neither
+            continue
+        seen.add(index)
+
+        candidate = entry["candidate"]
+        if str(candidate.get("jobpost_id", "")) not in job_post_ids:
+            continue
+        email = str(candidate.get("email") or "").strip().lower()
+        pdf_text, _ = resumes[index]
+        if "@" in email and email not in pdf_text.lower():
+            continue
+        results[index] = {"candidate": candidate}
+    return results
+
+
+class ResumeBatcher:
+    """
+    `match_batch(userId, resumes)` is an async function that matches a list of
+    (pdf_text, email_subject) in one request and returns a result or None per
+    resume; `match_single(userId, pdf_text, email_subject)` matches one.
+
+    A batch is sent when it reaches `batch_size` resumes or `wait` seconds
+    after its first resume arrived, whichever comes first.
+    """
+
+    def __init__(self, match_batch, match_single, batch_size=MATCH_BATCH_SIZE, wait=MATCH_BATCH_WAIT):
+        self.match_batch = match_batch
+        self.match_single = match_single
+        self.batch_size = batch_size
+        self.wait = wait
+        self._pending = {}
+        self._tasks = set()
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "batched_resumes": 0, "fallbacks": 0, "single": 0, "batch_seconds": 0.0}
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    async def submit(self, userId, pdf_text, email_subject):
+        if self.batch_size <= 1:
+            self._count("single")
+            return await self.match_single(userId, pdf_text, email_subject)
+
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.get(userId)
+        if batch is None:
+            batch = self._pending[userId] = []
+            asyncio.get_running_loop().call_later(self.wait, self._flush, userId, batch)
+        batch.append((pdf_text, email_subject, future))
+        if len(batch) >= self.batch_size:
+            self._flush(userId, batch)
+        return await future
+
+    def _flush(self, userId, batch):
+        # The timer and a full batch can both try to send the same batch
+        if self._pending.get(userId) is batch:
+            del self._pending[userId]
+            task = asyncio.ensure_future(self._run(userId, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, userId, batch):
+        resumes = [(pdf_text, email_subject) for pdf_text, email_subject, _ in batch]
+        results = [None] * len(batch)
+        if len(batch) > 1:
+            start = time.perf_counter()
+            try:
+                results = await self.match_batch(userId, resumes)
+            except Exception as e:
+                print(f"Batch of {len(batch)} resumes failed, matching them one by one: {e}")
+            self._count("batches")
+            self._count("batched_resumes", sum(result is not None for result in results))
+            self._count("batch_seconds", time.perf_counter() - start)
+
+        async def resolve(result, pdf_text, email_subject, future):
+            if result is None:
+                self._count("fallbacks" if len(batch) > 1 else "single")
+                try:
+                    result = await self.match_single(userId, pdf_text, email_subject)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    return
+            if not future.done():
+                future.set_result(result)
+
+        await asyncio.gather(*(
+            resolve(result, pdf_text, email_subject, future)
+            for result, (pdf_text, email_subject, future) in zip(results, batch)
+        ))
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["batch_seconds"] = round(stats["batch_seconds"], 2)
+        stats["avg_resumes_per_batch"] = round(stats["batched_resumes"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+
+
+def hash_pdf(pdf_bytes):
+    """
+    Content address of a resume: sha256 of the raw PDF bytes.
+    """
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def jobposts_fingerprint(jobposts, userId):
+    """
+    Fingerprint of the HR user's job-post set. Any added, removed or edited
+    post changes the fingerprint, which invalidates cached matches. The digest
+    is what the matching prompt sees (skills taken from the generated `details`
+    included), so a regenerated post changes it too.
+    """
+    fields = {"_id": 1, "job_title": 1, "job_description": 1, "job_location": 1,
+              "job_type": 1, "job_category": 1, "job_salary": 1, "digest": 1}
+    posts = [
+        {**post, "_id": str(post["_id"])}
+        for post in jobposts.find({"created_by": userId}, fields).sort("_id", 1)
+    ]
+    return hashlib.sha256(json.dumps(posts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def match_key(selection, selected, subject):
+    """
+    Which match of a PDF (for one HR user) a request can reuse: the job posts
+    selected for it and the email subject Gemini saw. The same resume sent
+    for two different posts gets two cached matches.
+    """
+    key = json.dumps([selection, [digest["id"] for digest in selected], (subject or "").strip().lower()])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class ResumeCache:
+    """
+    Mongo-backed cache of extracted resume text and Gemini match results.
+
+    One document per PDF hash:
+        {"_id": pdf_hash, "resume_text_id": "...",
+         "matches": {"<userId>:<match_key>": {"fingerprint": "...", "candidate": {...}}}}
+
+    The extracted text is shared by every HR user; a match is only reused for
+    the same job-post selection and subject (see match_key), and while the
+    user's job-post fingerprint is unchanged.
+
+    The text itself is kept once, compressed, in the ResumeStore `store`.
+    """
+
+    def __init__(self, collection, store):
+        self.collection = collection
+        self.store = store
+        self._lock = threading.Lock()
+        self.stats = {"text_hits": 0, "text_misses": 0, "match_hits": 0, "match_misses": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_text_id(self, pdf_hash):
+        """
+        The `resume_text_id` of the PDF's extracted text, or None.
+        """
+        doc = self.collection.find_one({"_id": pdf_hash}, {"resume_text_id": 1, "pdf_text": 1})
+        if not doc:
+            return None
+        if doc.get("resume_text_id") is None and doc.get("pdf_text") is not None:
+            # Cached before the text moved to the store
+            return self.put_text(pdf_hash, doc["pdf_text"])
+        return doc.get("resume_text_id")
+
+    def get_text(self, pdf_hash):
+        text_id = self.get_text_id(pdf_hash)
+        pdf_text = self.store.get(text_id) if text_id else None
+        self._count("text_hits" if pdf_text is not None else "text_misses")
+        return pdf_text
+
+    def put_text(self, pdf_hash, pdf_text):
+        """
+        Store the text in the ResumeStore and reference it; returns its id.
+        """
+        text_id = self.store.put(pdf_text)
+        self.collection.update_one(
+            {"_id": pdf_hash},
+            {"$set": {"resume_text_id": text_id}, "$unset": {"pdf_text": ""}},
+            upsert=True,
+        )
+        return text_id
+
+    def get_match(self, pdf_hash, userId, fingerprint, key):
+        field = f"{userId}:{key}"
+        doc = self.collection.find_one({"_id": pdf_hash}, {f"matches.{field}": 1})
+        match = (doc or {}).get("matches", {}).get(field)
+        if match and match.get("fingerprint") == fingerprint:
+            self._count("match_hits")
+            return match["candidate"]
+        self._count("match_misses")
+        return None
+
+    def put_match(self, pdf_hash, userId, fingerprint, key, candidate):
+        self.collection.update_one(
+            {"_id": pdf_hash},
+            {"$set": {f"matches.{userId}:{key}": {"fingerprint": fingerprint, "candidate": candidate}}},
+            upsert=True,
+        )
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        for kind in ("text", "match"):
+            total = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+            stats[f"{kind}_hit_rate"] = round(stats[f"{kind}_hits"] / total, 4) if total else 0.0
+        return stats
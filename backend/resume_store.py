@@ -0,0 +1,80 @@
+"""
+Compressed, content-addressed store for extracted resume text.
+
+`candidates`, `pdf_matches` and `resume_cache` reference the text by
+`resume_text_id` instead of each embedding its own copy of `pdf_text`. To
+migrate existing documents:
+
+    python resume_store.py
+"""
+import os
+import zlib
+import hashlib
+from bson import Binary
+from pymongo import UpdateOne
+
+
+class ResumeStore:
+    """
+    One document per distinct resume text:
+        {"_id": sha256(text), "data": zlib(text), "size": n, "compressed_size": m}
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def text_id(pdf_text):
+        return hashlib.sha256(pdf_text.encode("utf-8")).hexdigest()
+
+    def put(self, pdf_text):
+        """
+        Store `pdf_text` (once per distinct text) and return its id.
+        """
+        text_id = self.text_id(pdf_text)
+        raw = pdf_text.encode("utf-8")
+        data = zlib.compress(raw, 6)
+        self.collection.update_one(
+            {"_id": text_id},
+            {"$setOnInsert": {"data": Binary(data), "size": len(raw), "compressed_size": len(data)}},
+            upsert=True,
+        )
+        return text_id
+
+    def get(self, text_id):
+        doc = self.collection.find_one({"_id": text_id}, {"data": 1})
+        if not doc:
+            return None
+        return zlib.decompress(doc["data"]).decode("utf-8")
+
+
+def migrate_embedded_texts(store, collections, batch_size=500):
+    """
+    Move embedded `pdf_text` fields into the store, replacing them with
+    `resume_text_id`. Safe to re-run; returns the number of documents migrated.
+    """
+    migrated = 0
+    for collection in collections:
+        updates = []
+        for doc in collection.find({"pdf_text": {"$exists": True}}, {"pdf_text": 1}):
+            text_id = store.put(doc["pdf_text"] or "")
+            updates.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"resume_text_id": text_id}, "$unset": {"pdf_text": ""}},
+            ))
+            if len(updates) >= batch_size:
+                migrated += collection.bulk_write(updates, ordered=False).modified_count
+                updates = []
+        if updates:
+            migrated += collection.bulk_write(updates, ordered=False).modified_count
+    return migrated
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"))["hr_management_system"]
+    count = migrate_embedded_texts(ResumeStore(db["resume_texts"]), [db["candidates"], db["pdf_matches"], db["resume_cache"]])
+    print(f"✅ Migrated {count} documents to resume_texts.")
@@ -0,0 +1,156 @@
+import os
+import heapq
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+MAILBOX_WORKERS = int(os.getenv("MAILBOX_WORKERS", "4"))
+MAILBOX_POLL_INTERVAL = int(os.getenv("MAILBOX_POLL_INTERVAL", "3600"))
+MAILBOX_POLL_JITTER = int(os.getenv("MAILBOX_POLL_JITTER", "300"))
+# How often the list of HR users is re-read to pick up new or deleted mailboxes
+MAILBOX_REFRESH_INTERVAL = int(os.getenv("MAILBOX_REFRESH_INTERVAL", "60"))
+
+
+class MailboxScheduler:
+    """
+    Runs one recurring job per HR mailbox on a bounded worker pool.
+
+    Every user has their own next-run time (interval plus random jitter), a
+    user is never processed by two workers at once, and a failure or stall in
+    one mailbox only affects that mailbox's own schedule.
+    """
+
+    def __init__(self, job, list_user_ids, workers=MAILBOX_WORKERS,
+                 interval=MAILBOX_POLL_INTERVAL, jitter=MAILBOX_POLL_JITTER):
+        self.job = job
+        self.list_user_ids = list_user_ids
+        self.workers = workers
+        self.interval = interval
+        self.jitter = jitter
+
+        self._heap = []  # (next_run_monotonic, userId)
+        self._next_run = {}  # userId -> the heap entry that is current
+        self._scheduled = set()
+        self._running = set()
+        self._status = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+        self._executor = None
+        self._thread = None
+        self._last_refresh = 0.0
+
+    def start(self):
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mailbox")
+        self._thread = threading.Thread(target=self._dispatch_loop, name="mailbox-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        """
+        Stop dispatching, drop queued jobs and wait for running ones to finish.
+        """
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _next_delay(self):
+        return self.interval + random.uniform(0, self.jitter)
+
+    def _push(self, userId, next_run):
+        # Caller holds the lock
+        self._next_run[userId] = next_run
+        heapq.heappush(self._heap, (next_run, userId))
+
+    def _refresh_users(self):
+        try:
+            user_ids = set(self.list_user_ids())
+        except Exception as e:
+            print(f"Mailbox scheduler could not list users: {e}")
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            for userId in user_ids - self._scheduled:
+                # Spread the first runs over the jitter window instead of all at once
+                self._scheduled.add(userId)
+                if userId not in self._running:  # a running job reschedules itself
+                    self._push(userId, now + random.uniform(0, self.jitter))
+                self._status.setdefault(userId, {"runs": 0, "failures": 0})
+            for userId in self._scheduled - user_ids:
+                self._scheduled.discard(userId)
+                self._next_run.pop(userId, None)
+                self._status.pop(userId, None)
+        self._last_refresh = now
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            if time.monotonic() - self._last_refresh >= MAILBOX_REFRESH_INTERVAL:
+                self._refresh_users()
+
+            with self._wakeup:
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now and len(self._running) < self.workers:
+                    next_run, userId = heapq.heappop(self._heap)
+                    if self._next_run.get(userId) != next_run:
+                        continue  # stale entry: user removed or rescheduled
+                    del self._next_run[userId]
+                    self._running.add(userId)
+                    self._executor.submit(self._run, userId)
+
+                wait = MAILBOX_REFRESH_INTERVAL
+                if self._heap and len(self._running) < self.workers:
+                    wait = min(wait, max(self._heap[0][0] - now, 0))
+                self._wakeup.wait(timeout=max(wait, 0.05))
+
+    def _run(self, userId):
+        started = datetime.utcnow()
+        began = time.monotonic()
+        error = None
+        try:
+            self.job(userId)
+        except Exception as e:
+            error = str(e)
+            print(f"Mailbox job failed for user {userId}: {e}")
+            traceback.print_exc()
+
+        with self._wakeup:
+            self._running.discard(userId)
+            status = self._status.get(userId)
+            if status is not None:
+                status["runs"] += 1
+                status["last_started"] = started
+                status["last_duration_s"] = round(time.monotonic() - began, 3)
+                status["last_error"] = error
+                if error:
+                    status["failures"] += 1
+            if userId in self._scheduled and not self._stopping.is_set():
+                self._push(userId, time.monotonic() + self._next_delay())
+            self._wakeup.notify_all()
+
+    def get_status(self):
+        now = time.monotonic()
+        with self._lock:
+            users = {
+                userId: {
+                    **status,
+                    "running": userId in self._running,
+                    "next_run_in_s": round(max(self._next_run[userId] - now, 0), 1) if userId in self._next_run else None,
+                }
+                for userId, status in self._status.items()
+            }
+            return {
+                "workers": self.workers,
+                "running": len(self._running),
+                "queue_depth": sum(1 for next_run in self._next_run.values() if next_run <= now),
+                "scheduled": len(self._next_run),
+                "users": users,
+            }
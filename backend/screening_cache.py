@@ -0,0 +1,62 @@
+import threading
+from datetime import datetime
+from pymongo import ReturnDocument
+
+
+class ScreeningCache:
+    """
+    One screening document per (userId, candidate):
+        {"userId": ..., "candidate_id": ..., "job_hash": "...", "candidate_hash": "...",
+         "screening": {...}, "screened_at": ...}
+
+    A stored screening is only reused while both the job post and the
+    candidate profile hash to the values it was generated from.
+
+    `collection` is an async (Motor) collection.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "forced": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    async def get(self, userId, candidate_id, job_hash, candidate_hash):
+        doc = await self.collection.find_one({"userId": userId, "candidate_id": candidate_id})
+        if doc and doc.get("job_hash") == job_hash and doc.get("candidate_hash") == candidate_hash:
+            self._count("hits")
+            return doc
+        # Screened before, but the job post or the candidate has changed since
+        self._count("stale" if doc else "misses")
+        return None
+
+    async def put(self, userId, candidate_id, job_hash, candidate_hash, screening_data):
+        """
+        Store the screening, replacing any earlier one for this candidate, and return its id.
+        """
+        doc = await self.collection.find_one_and_update(
+            {"userId": userId, "candidate_id": candidate_id},
+            {"$set": {
+                "job_hash": job_hash,
+                "candidate_hash": candidate_hash,
+                "screening": screening_data,
+                "screened_at": datetime.utcnow(),
+            }},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return str(doc["_id"])
+
+    def count_forced(self):
+        self._count("forced")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+        return stats
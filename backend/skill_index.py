@@ -0,0 +1,237 @@
+"""
+Ingest-time normalization of the Gemini-extracted candidate profile into
+queryable facets, and the faceted candidate search built on them.
+
+Each stored candidate gets:
+    "facets": {"skill_ids": ["python", "react"], "experience_years": 5.0, "location": "dhaka, bangladesh"}
+
+To backfill candidates stored before facets existed:
+
+    python skill_index.py
+"""
+import os
+import re
+import json
+from pathlib import Path
+from pymongo import UpdateOne
+
+
+SYNONYMS_FILE = Path(__file__).with_name("skills_synonyms.json")
+
+EXPERIENCE_BUCKETS = [0, 1, 3, 5, 10, 100]
+
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_YEARS_RE = re.compile(_NUMBER + r"\s*\+?\s*(?:years?|yrs?|y)\b")
+_MONTHS_RE = re.compile(_NUMBER + r"\s*\+?\s*(?:months?|mos?)\b")
+_BARE_NUMBER_RE = re.compile(r"^\s*" + _NUMBER + r"\s*\+?\s*$")
+
+# Skill names that are also everyday English words ("less than", "express
+# interest", "react to"): in prose they only count when written capitalized
+# mid-sentence ("Less", "Express", "React") or in capitals ("REST")
+PROSE_AMBIGUOUS = {
+    "less", "express", "rest", "react", "node", "spring", "swift", "rust", "ruby", "dart",
+    "flask", "rails", "jest", "torch", "excel", "bootstrap", "containers",
+}
+_WORD_RE = re.compile(r"[A-Za-z0-9+#.]+")
+
+
+def _key(text):
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+def _load_synonyms(path=SYNONYMS_FILE):
+    with open(path) as f:
+        canonical = json.load(f)
+    lookup = {}
+    for skill_id, synonyms in canonical.items():
+        lookup[_key(skill_id.replace("_", " "))] = skill_id
+        for synonym in synonyms:
+            lookup[_key(synonym)] = skill_id
+    return lookup
+
+
+SKILL_LOOKUP = _load_synonyms()
+
+
+def normalize_skill(raw):
+    """
+    Canonical skill id for a free-text skill. Unknown skills become a slug
+    of the text so they are still searchable.
+    """
+    key = _key(str(raw))
+    if not key:
+        return None
+    if key in SKILL_LOOKUP:
+        return SKILL_LOOKUP[key]
+    # "React.js (Hooks)" -> "react.js"
+    stripped = _key(re.sub(r"\(.*?\)", "", key))
+    if stripped in SKILL_LOOKUP:
+        return SKILL_LOOKUP[stripped]
+    return re.sub(r"[^a-z0-9+#.]+", "_", stripped).strip("_") or None
+
+
+def normalize_skills(skills):
+    if isinstance(skills, str):
+        skills = re.split(r"[,;/|\n]", skills)
+    skill_ids = []
+    for skill in skills or []:
+        skill_id = normalize_skill(skill)
+        if skill_id and skill_id not in skill_ids:
+            skill_ids.append(skill_id)
+    return skill_ids
+
+
+def extract_skills(text, max_words=3):
+    """
+    Known skills mentioned anywhere in free text (e.g. a job description), in
+    order of first mention. Only synonyms from the bundled list are matched,
+    very short ones ("r", "go", "js") are skipped as too ambiguous in prose and
+    PROSE_AMBIGUOUS words need their capitalized spelling.
+    """
+    text = str(text)
+    tokens = []  # (word, original spelling, starts a sentence)
+    for match in _WORD_RE.finditer(text):
+        original = match.group().strip(".")
+        if original:
+            before = text[:match.start()].rstrip()
+            tokens.append((original.lower(), original, not before or before[-1] in ".!?"))
+    words = [word for word, _, _ in tokens]
+    skill_ids = []
+    for start in range(len(words)):
+        for size in range(max_words, 0, -1):
+            phrase = " ".join(words[start:start + size])
+            if size == 1 and len(phrase) <= 2 and phrase.isalnum():
+                continue
+            if size == 1 and phrase in PROSE_AMBIGUOUS:
+                _, original, sentence_start = tokens[start]
+                if original.islower() or (sentence_start and not original.isupper()):
+                    continue
+            skill_id = SKILL_LOOKUP.get(phrase)
+            if skill_id:
+                if skill_id not in skill_ids:
+                    skill_ids.append(skill_id)
+                break
+    return skill_ids
+
+
+def parse_experience_years(experience):
+    """
+    Years of experience from free text such as "5 years", "3+ yrs",
+    "2 years 6 months" or "18 months". None when no duration is found.
+    """
+    if experience is None:
+        return None
+    if isinstance(experience, (int, float)):
+        return float(experience)
+    if isinstance(experience, (list, tuple)):
+        values = [parse_experience_years(item) for item in experience]
+        values = [value for value in values if value is not None]
+        return round(sum(values), 2) if values else None
+
+    text = str(experience).lower()
+    bare = _BARE_NUMBER_RE.match(text)
+    if bare:
+        return float(bare.group(1))
+
+    years = sum(float(value) for value in _YEARS_RE.findall(text))
+    months = sum(float(value) for value in _MONTHS_RE.findall(text))
+    if not years and not months:
+        return None
+    return round(years + months / 12, 2)
+
+
+def normalize_location(location):
+    if not location or not isinstance(location, str):
+        return None
+    parts = [_key(part) for part in re.split(r"[,/|]", location) if part.strip()]
+    return ", ".join(parts) or None
+
+
+def candidate_facets(profile):
+    profile = profile or {}
+    return {
+        "skill_ids": normalize_skills(profile.get("skills")),
+        "experience_years": parse_experience_years(profile.get("experience")),
+        "location": normalize_location(profile.get("location")),
+    }
+
+
+def search_pipeline(userId, skills=None, location=None, min_experience=None, max_experience=None,
+                    job_post_id=None, limit=50, facet_size=20):
+    """
+    One aggregation returning the matching candidates and the facet counts
+    (skills, locations, experience buckets) for the same filter.
+    """
+    match = {"userId": userId}
+    skill_ids = normalize_skills(skills) if skills else []
+    if skill_ids:
+        match["facets.skill_ids"] = {"$all": skill_ids}
+    if location:
+        # Prefix match on the normalized location can use the index
+        match["facets.location"] = {"$regex": "^" + re.escape(normalize_location(location) or "")}
+    if min_experience is not None or max_experience is not None:
+        match["facets.experience_years"] = {}
+        if min_experience is not None:
+            match["facets.experience_years"]["$gte"] = min_experience
+        if max_experience is not None:
+            match["facets.experience_years"]["$lte"] = max_experience
+    if job_post_id:
+        match["candidate.candidate.jobpost_id"] = job_post_id
+
+    return [
+        {"$match": match},
+        {"$facet": {
+            "results": [
+                {"$sort": {"facets.experience_years": -1, "_id": 1}},
+                {"$limit": limit},
+                {"$project": {"pdf_text": 0}},
+            ],
+            "total": [{"$count": "count"}],
+            "skills": [
+                {"$unwind": "$facets.skill_ids"},
+                {"$group": {"_id": "$facets.skill_ids", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": facet_size},
+            ],
+            "locations": [
+                {"$match": {"facets.location": {"$ne": None}}},
+                {"$group": {"_id": "$facets.location", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": facet_size},
+            ],
+            "experience": [
+                {"$bucket": {
+                    "groupBy": "$facets.experience_years",
+                    "boundaries": EXPERIENCE_BUCKETS,
+                    "default": "unknown",
+                    "output": {"count": {"$sum": 1}},
+                }},
+            ],
+        }},
+    ]
+
+
+def backfill_facets(collection, batch_size=500):
+    """
+    Compute facets for stored candidates that do not have them yet.
+    """
+    updated = 0
+    updates = []
+    for doc in collection.find({"facets": {"$exists": False}}, {"candidate.candidate": 1}):
+        profile = (doc.get("candidate") or {}).get("candidate")
+        updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"facets": candidate_facets(profile)}}))
+        if len(updates) >= batch_size:
+            updated += collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        updated += collection.bulk_write(updates, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"))["hr_management_system"]
+    print(f"✅ Added facets to {backfill_facets(db['candidates'])} candidates.")
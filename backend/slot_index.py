@@ -0,0 +1,154 @@
+"""
+In-memory interval index of each interviewer's upcoming slots.
+
+Per interviewer it keeps two lists sorted by start time:
+    slots: (start, end) of every slot, open or booked, for overlap checks
+    free:  (start, end, slot_id) of the open ones, for "next N free slots"
+Both are answered with a binary search (O(log n), plus N for the slots returned).
+
+The lists are loaded from MongoDB on first use and reloaded after
+SLOT_INDEX_TTL seconds, which bounds how long changes made by another
+process go unseen. Slots that have ended are pruned as queries pass them.
+"""
+import os
+import asyncio
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+
+SLOT_INDEX_TTL = float(os.getenv("SLOT_INDEX_TTL", "60"))
+
+
+def time_now():
+    return datetime.utcnow()
+
+
+class InterviewerSlots:
+    def __init__(self, slots):
+        self.slots = sorted((slot["start_time"], slot["end_time"]) for slot in slots)
+        self.free = sorted(
+            (slot["start_time"], slot["end_time"], slot["_id"]) for slot in slots if slot.get("available")
+        )
+        self.loaded_at = time_now()
+
+    def overlaps(self, start, end):
+        """
+        True when [start, end) overlaps a slot. Slots do not overlap each other,
+        so of the slots starting before `end` the last one also ends last.
+        """
+        i = bisect_left(self.slots, (end,))
+        return i > 0 and self.slots[i - 1][1] > start
+
+    def add(self, start, end, slot_id):
+        insort(self.slots, (start, end))
+        insort(self.free, (start, end, slot_id))
+
+    def take(self, start):
+        """
+        Remove the open slot starting at `start` from the free list.
+        """
+        i = bisect_left(self.free, (start,))
+        if i < len(self.free) and self.free[i][0] == start:
+            del self.free[i]
+
+    def give_back(self, start, end, slot_id):
+        i = bisect_left(self.free, (start,))
+        if i == len(self.free) or self.free[i][0] != start:
+            self.free.insert(i, (start, end, slot_id))
+
+    def next_free(self, n, after):
+        i = bisect_right(self.free, (after,))
+        return self.free[i:i + n]
+
+    def prune(self, now):
+        """
+        Drop the slots that have ended.
+        """
+        for items in (self.slots, self.free):
+            i = bisect_left(items, (now,))
+            while i > 0 and items[i - 1][1] > now:
+                i -= 1  # started before now but still running
+            if i:
+                del items[:i]
+
+class SlotIndex:
+    """
+    `collection` is an async (Motor) slots collection.
+    """
+
+    def __init__(self, collection, ttl=SLOT_INDEX_TTL):
+        self.collection = collection
+        self.ttl = ttl
+        self._interviewers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "overlap_checks": 0, "conflicts": 0, "free_queries": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    async def get(self, userId):
+        """
+        The interviewer's slots, (re)loaded from MongoDB when missing or older than the TTL.
+        """
+        entry = self._interviewers.get(userId)
+        if entry and (time_now() - entry.loaded_at).total_seconds() < self.ttl:
+            entry.prune(time_now())
+            return entry
+        cursor = self.collection.find(
+            {"userId": userId, "end_time": {"$gt": time_now()}},
+            {"start_time": 1, "end_time": 1, "available": 1}
+        )
+        loaded = InterviewerSlots([slot async for slot in cursor])
+        self._interviewers[userId] = loaded
+        self._count("loads")
+        return loaded
+
+    def lock(self, userId):
+        """
+        Per-interviewer lock to hold across an overlap check and the insert that follows it.
+        """
+        return self._locks.setdefault(userId, asyncio.Lock())
+
+    async def find_conflicts(self, userId, times):
+        """
+        The (start, end) times that overlap an existing slot or an earlier one of `times`.
+        """
+        entry = await self.get(userId)
+        conflicts = []
+        latest_end = None
+        for start, end in sorted(times):
+            if entry.overlaps(start, end) or (latest_end is not None and start < latest_end):
+                conflicts.append((start, end))
+            latest_end = end if latest_end is None else max(latest_end, end)
+        self._count("overlap_checks", len(times))
+        self._count("conflicts", len(conflicts))
+        return conflicts
+
+    async def add(self, userId, slots):
+        entry = await self.get(userId)
+        for slot in slots:
+            entry.add(slot["start_time"], slot["end_time"], slot["_id"])
+
+    async def take(self, userId, slot):
+        (await self.get(userId)).take(slot["start_time"])
+
+    async def give_back(self, userId, slot):
+        (await self.get(userId)).give_back(slot["start_time"], slot["end_time"], slot["_id"])
+
+    async def next_free(self, userId, n, after=None):
+        """
+        The next `n` open (start, end, slot_id) slots starting after `after` (default: now).
+        """
+        entry = await self.get(userId)
+        self._count("free_queries")
+        return entry.next_free(n, max(after or time_now(), time_now()))
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["interviewers"] = len(self._interviewers)
+        stats["slots"] = sum(len(entry.slots) for entry in list(self._interviewers.values()))
+        return stats
@@ -0,0 +1,124 @@
+"""
+Interview slot expansion and (de)serialization.
+
+Slot times are stored as naive UTC datetimes (like datetime.utcnow()) and
+returned to clients as ISO strings with a "Z" suffix. Slots created before
+that kept their times as ISO strings; to convert them:
+
+    python slot_schedule.py
+"""
+import os
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pymongo import UpdateOne
+
+
+MAX_SLOTS_PER_REQUEST = int(os.getenv("MAX_SLOTS_PER_REQUEST", "500"))
+
+WEEKDAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+
+def to_utc(value):
+    """
+    Parse an ISO datetime into a naive UTC datetime; times without an offset are taken as UTC.
+    """
+    if isinstance(value, str):
+        value = value[:-1] + "+00:00" if value.endswith("Z") else value
+        moment = datetime.fromisoformat(value)
+    else:
+        moment = value
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def slot_json(value):
+    """
+    JSON encoder default for slot documents: datetimes as "2025-04-10T10:00:00Z".
+    """
+    if isinstance(value, datetime):
+        return value.isoformat() + "Z"
+    return str(value)
+
+
+def expand_recurrence(start_date, end_date, weekdays, day_start, day_end, duration, gap=0, tz="UTC"):
+    """
+    (start, end) naive UTC datetimes of back-to-back `duration`-minute slots, `gap`
+    minutes apart, between `day_start` and `day_end` ("HH:MM", local to `tz`)
+    on the given weekdays from `start_date` through `end_date` (inclusive).
+
+    e.g. weekdays 10:00-16:00 for two weeks:
+        expand_recurrence("2025-04-07", "2025-04-18", ["mon", "tue", "wed", "thu", "fri"], "10:00", "16:00", 60)
+
+    Raises ValueError for an invalid rule or more than MAX_SLOTS_PER_REQUEST slots.
+    """
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {tz}")
+    first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    opens, closes = time.fromisoformat(day_start), time.fromisoformat(day_end)
+    unknown = [day for day in weekdays if day.lower()[:3] not in WEEKDAYS]
+    if unknown:
+        raise ValueError(f"Unknown weekdays: {', '.join(unknown)}")
+    days = {WEEKDAYS[day.lower()[:3]] for day in weekdays}
+    if last < first:
+        raise ValueError("end_date is before start_date")
+    if closes <= opens:
+        raise ValueError("day_end must be after day_start")
+    if duration <= 0 or gap < 0:
+        raise ValueError("duration must be positive and gap not negative")
+
+    length, step = timedelta(minutes=duration), timedelta(minutes=duration + gap)
+    slots = []
+    day = first
+    while day <= last:
+        if day.weekday() in days:
+            start = datetime.combine(day, opens, tzinfo=zone)
+            day_close = datetime.combine(day, closes, tzinfo=zone)
+            while start + length <= day_close:
+                slots.append((to_utc(start), to_utc(start + length)))
+                if len(slots) > MAX_SLOTS_PER_REQUEST:
+                    raise ValueError(f"The rule yields more than {MAX_SLOTS_PER_REQUEST} slots")
+                start += step
+        day += timedelta(days=1)
+    return slots
+
+
+def slot_document(userId, start, end):
+    return {
+        "userId": str(userId),
+        "start_time": start,
+        "end_time": end,
+        "available": True,
+    }
+
+
+def migrate_slot_times(collection, batch_size=500):
+    """
+    Convert slots whose start_time/end_time are ISO strings into UTC datetimes.
+    Safe to re-run; returns the number of slots converted.
+    """
+    migrated = 0
+    updates = []
+    for slot in collection.find({"start_time": {"$type": "string"}}, {"start_time": 1, "end_time": 1}):
+        updates.append(UpdateOne(
+            {"_id": slot["_id"]},
+            {"$set": {"start_time": to_utc(slot["start_time"]), "end_time": to_utc(slot["end_time"])}},
+        ))
+        if len(updates) >= batch_size:
+            migrated += collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        migrated += collection.bulk_write(updates, ordered=False).modified_count
+    return migrated
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from pymongo import MongoClient
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"))["hr_management_system"]
+    count = migrate_slot_times(db["slots"])
+    print(f"✅ Converted the times of {count} slots to datetimes.")
@@ -0,0 +1,249 @@
+from datetime import datetime, timedelta
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from gmail_sync import GmailSync, GMAIL_MAX_RETRIES
+
+
+class FakeCollection:
+    """
+    The find_one/update_one subset of a pymongo collection that GmailSync uses.
+    """
+
+    def __init__(self, docs=None):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs or []}
+
+    def find_one(self, query, projection=None):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        doc.update(update["$set"])
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeGmail:
+    """
+    Gmail service double: users().history().list, users().messages().list and
+    users().getProfile, each answering from pages keyed by pageToken.
+    """
+
+    def __init__(self, history_pages=None, message_pages=None, history_id="900", history_error=None):
+        self.history_pages = history_pages or []
+        self.message_pages = message_pages or []
+        self.history_id = history_id
+        self.history_error = history_error
+        self.calls = []
+
+    def users(self):
+        return self
+
+    def history(self):
+        return _Resource(self, "history.list", self._history_list)
+
+    def messages(self):
+        return _Resource(self, "messages.list", self._messages_list)
+
+    def getProfile(self, userId):
+        self.calls.append(("getProfile", {"userId": userId}))
+        return FakeRequest({"emailAddress": "hr@example.com", "historyId": self.history_id})
+
+    def _history_list(self, **kwargs):
+        if self.history_error is not None:
+            return FakeRequest(self.history_error)
+        return FakeRequest(self._page(self.history_pages, kwargs.get("pageToken")))
+
+    def _messages_list(self, **kwargs):
+        return FakeRequest(self._page(self.message_pages, kwargs.get("pageToken")))
+
+    @staticmethod
+    def _page(pages, page_token):
+        index = int(page_token) if page_token else 0
+        page = dict(pages[index])
+        if index + 1 < len(pages):
+            page["nextPageToken"] = str(index + 1)
+        return page
+
+    def count(self, name):
+        return sum(1 for call, _ in self.calls if call == name)
+
+
+class _Resource:
+    def __init__(self, service, name, handler):
+        self.service = service
+        self.name = name
+        self.handler = handler
+
+    def list(self, **kwargs):
+        self.service.calls.append((self.name, kwargs))
+        return self.handler(**kwargs)
+
+
+def added(*message_ids):
+    return {"messagesAdded": [{"message": {"id": message_id}} for message_id in message_ids]}
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({"status": status}), b"{}")
+
+
+def test_history_sync_follows_pages_and_dedupes():
+    service = FakeGmail(history_pages=[
+        {"history": [added("m1", "m2")], "historyId": "110"},
+        {"history": [added("m2"), added("m3")], "historyId": "120"},
+    ])
+    sync = GmailSync(FakeCollection([{"_id": "u1", "history_id": "100"}]))
+
+    message_ids, checkpoint = sync.poll(service, "u1")
+
+    assert message_ids == ["m1", "m2", "m3"]
+    assert checkpoint["history_id"] == "120"
+    assert checkpoint["last_poll"]["mode"] == "history"
+    assert checkpoint["last_poll"]["api_calls"] == 2
+    assert checkpoint["last_poll"]["messages"] == 3
+    assert service.count("history.list") == 2
+    assert service.count("messages.list") == 0
+    # Every page continues from the stored checkpoint
+    assert all(kwargs["startHistoryId"] == "100" for _, kwargs in service.calls)
+    assert [kwargs["pageToken"] for _, kwargs in service.calls] == [None, "1"]
+
+
+def test_history_sync_with_no_new_messages_keeps_moving_the_checkpoint():
+    service = FakeGmail(history_pages=[{"historyId": "105"}])
+    sync = GmailSync(FakeCollection([{"_id": "u1", "history_id": "100"}]))
+
+    message_ids, checkpoint = sync.poll(service, "u1")
+
+    assert message_ids == []
+    assert checkpoint["history_id"] == "105"
+    assert checkpoint["last_poll"]["api_calls"] == 1
+
+
+def test_expired_checkpoint_falls_back_to_full_sync():
+    service = FakeGmail(
+        history_error=http_error(404),
+        message_pages=[{"messages": [{"id": "m1"}, {"id": "m2"}]}],
+        history_id="500",
+    )
+    synced_at = datetime(2025, 1, 1)
+    sync = GmailSync(FakeCollection([{"_id": "u1", "history_id": "100", "synced_at": synced_at}]))
+
+    message_ids, checkpoint = sync.poll(service, "u1")
+
+    assert message_ids == ["m1", "m2"]
+    assert checkpoint["history_id"] == "500"
+    assert checkpoint["last_poll"]["mode"] == "full"
+    # failed history.list + getProfile + one messages.list page
+    assert checkpoint["last_poll"]["api_calls"] == 3
+    # The full sync starts from the last successful sync
+    assert service.calls[-1][1]["q"] == "in:inbox after:1735689600"  # 2025-01-01T00:00:00Z
+
+
+def test_other_history_errors_are_raised():
+    service = FakeGmail(history_error=http_error(500))
+    sync = GmailSync(FakeCollection([{"_id": "u1", "history_id": "100"}]))
+
+    with pytest.raises(HttpError):
+        sync.poll(service, "u1")
+    assert service.count("messages.list") == 0
+
+
+def test_first_sync_pages_through_the_inbox():
+    service = FakeGmail(
+        message_pages=[
+            {"messages": [{"id": "m1"}, {"id": "m2"}]},
+            {"messages": [{"id": "m3"}]},
+            {"resultSizeEstimate": 0},
+        ],
+        history_id="700",
+    )
+    sync = GmailSync(FakeCollection())
+
+    message_ids, checkpoint = sync.poll(service, "u1")
+
+    assert message_ids == ["m1", "m2", "m3"]
+    assert checkpoint["history_id"] == "700"
+    assert checkpoint["last_poll"]["mode"] == "full"
+    assert checkpoint["last_poll"]["api_calls"] == 4  # getProfile + 3 pages
+    # The profile (and so the checkpoint) is read before listing
+    assert service.calls[0][0] == "getProfile"
+    assert [kwargs["pageToken"] for name, kwargs in service.calls if name == "messages.list"] == [None, "1", "2"]
+    assert service.count("history.list") == 0
+
+
+def test_first_sync_looks_back_the_initial_window(monkeypatch):
+    monkeypatch.setattr("gmail_sync.GMAIL_INITIAL_SYNC_HOURS", 2)
+    service = FakeGmail(message_pages=[{}])
+    GmailSync(FakeCollection()).poll(service, "u1")
+
+    after = int(service.calls[-1][1]["q"].rsplit("after:", 1)[1])
+    expected = (datetime.utcnow() - timedelta(hours=2) - datetime(1970, 1, 1)).total_seconds()
+    assert abs(after - expected) < 60
+
+
+def test_checkpoint_is_only_stored_on_commit():
+    service = FakeGmail(history_pages=[{"history": [added("m1")], "historyId": "150"}])
+    collection = FakeCollection([{"_id": "u1", "history_id": "100"}])
+    sync = GmailSync(collection)
+
+    message_ids, checkpoint = sync.poll(service, "u1")
+    assert sync.get_cursor("u1")["history_id"] == "100"
+
+    # Not committed (e.g. the messages failed to process): the next poll re-delivers them
+    again, _ = sync.poll(service, "u1")
+    assert again == message_ids == ["m1"]
+    assert service.calls[-1][1]["startHistoryId"] == "100"
+
+    sync.commit("u1", checkpoint)
+    cursor = sync.get_cursor("u1")
+    assert cursor["history_id"] == "150"
+    assert cursor["last_poll"]["messages"] == 1
+
+    sync.poll(service, "u1")
+    assert service.calls[-1][1]["startHistoryId"] == "150"
+
+
+def test_failed_messages_are_retried_by_the_next_polls():
+    service = FakeGmail(history_pages=[{"history": [added("m1", "m2")], "historyId": "150"}])
+    sync = GmailSync(FakeCollection([{"_id": "u1", "history_id": "100"}]))
+
+    _, checkpoint = sync.poll(service, "u1")
+    sync.mark_failed("u1", checkpoint, {"m2"})
+    sync.commit("u1", checkpoint)
+    assert sync.get_cursor("u1")["history_id"] == "150"
+
+    # The checkpoint moved on, the failed message comes back once
+    service.history_pages = [{"history": [added("m3")], "historyId": "160"}]
+    message_ids, checkpoint = sync.poll(service, "u1")
+    assert message_ids == ["m3", "m2"]
+    assert checkpoint["last_poll"]["retried"] == 1
+    sync.commit("u1", checkpoint)
+
+    service.history_pages = [{"historyId": "170"}]
+    message_ids, _ = sync.poll(service, "u1")
+    assert message_ids == []
+
+
+def test_a_message_that_keeps_failing_is_given_up():
+    service = FakeGmail(history_pages=[{"historyId": "150"}])
+    sync = GmailSync(FakeCollection([{"_id": "u1", "history_id": "100", "retry_ids": {"m1": 1}}]))
+
+    for _ in range(GMAIL_MAX_RETRIES - 1):
+        message_ids, checkpoint = sync.poll(service, "u1")
+        assert message_ids == ["m1"]
+        sync.mark_failed("u1", checkpoint, message_ids)
+        sync.commit("u1", checkpoint)
+
+    assert sync.get_cursor("u1")["retry_ids"] == {}
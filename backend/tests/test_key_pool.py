@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import key_pool
+from key_pool import GeminiKeyPool, mask_key, parse_retry_after
+
+
+class FakeClock:
+    """
+    Stands in for time.monotonic; asyncio.sleep advances it instead of waiting.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(key_pool.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def acquire(pool, api_key=None):
+    return asyncio.run(pool.acquire(api_key))
+
+
+def test_acquire_spreads_requests_over_the_least_loaded_key(clock):
+    pool = GeminiKeyPool(["key-a", "key-b"], rpm=60, burst=2)
+
+    first = acquire(pool)
+    second = acquire(pool)
+
+    assert {first, second} == {"key-a", "key-b"}
+    assert all(state.in_flight == 1 for state in pool.states.values())
+
+    pool.release(first, 200)
+    pool.release(second, 200)
+    assert all(state.in_flight == 0 for state in pool.states.values())
+
+
+def test_acquire_waits_for_a_token_when_the_burst_is_spent(clock):
+    pool = GeminiKeyPool(["key-a"], rpm=60, burst=1)
+
+    pool.release(acquire(pool), 200)
+    pool.release(acquire(pool), 200)
+
+    # One token per second at 60 rpm
+    assert clock.slept == [pytest.approx(1.0)]
+    assert pool.waits == 1
+
+
+def test_a_429_cools_the_key_down_for_its_retry_after(clock):
+    pool = GeminiKeyPool(["key-a", "key-b"], rpm=60, burst=5)
+
+    key = acquire(pool)
+    assert pool.release(key, 429, retry_after=30) == 30
+
+    # The other key serves the next requests while the first one cools down
+    assert acquire(pool) != key
+    stats = {row["key"]: row for row in pool.get_stats()["keys"]}
+    assert stats[mask_key(key)]["cooldown_seconds"] == 30
+    assert stats[mask_key(key)]["throttled"] == 1
+
+
+def test_a_429_without_retry_after_backs_off_exponentially(clock):
+    pool = GeminiKeyPool(["key-a"], rpm=60, burst=5)
+
+    delays = []
+    for _ in range(3):
+        key = acquire(pool)
+        delays.append(pool.release(key, 429))
+        clock.now += delays[-1] + 5  # cooled down and refilled
+
+    base = key_pool.GEMINI_BACKOFF_BASE
+    assert delays == [base, base * 2, base * 4]
+
+    # A success resets the backoff
+    pool.release(acquire(pool), 200)
+    assert pool.release(acquire(pool), 429) == base
+
+
+def test_a_users_own_key_gets_a_dedicated_bucket(clock):
+    pool = GeminiKeyPool(["key-a"], rpm=60, burst=1)
+
+    assert acquire(pool, "user-key") == "user-key"
+    assert "user-key" not in pool.states
+
+    # The dedicated bucket is spent; the shared one is untouched
+    assert pool.states["key-a"].tokens == 1
+    pool.release("user-key", 200)
+    assert acquire(pool, "user-key") == "user-key"
+    assert clock.slept == [pytest.approx(1.0)]
+
+    # A shared key means any shared key will do
+    assert acquire(pool, "key-a") == "key-a"
+    shared = {row["key"]: row["shared"] for row in pool.get_stats()["keys"]}
+    assert shared == {mask_key("key-a"): True, mask_key("user-key"): False}
+
+
+def test_an_empty_pool_refuses_to_acquire(clock):
+    with pytest.raises(ValueError):
+        acquire(GeminiKeyPool([]))
+
+
+def test_errors_are_counted_without_a_cooldown(clock):
+    pool = GeminiKeyPool(["key-a"], rpm=60, burst=5)
+
+    assert pool.release(acquire(pool), 500) == 0.0
+    pool.release(acquire(pool))  # no response at all
+
+    state = pool.states["key-a"]
+    assert state.stats["errors"] == 2
+    assert state.cooldown_until == 0.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # already passed
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
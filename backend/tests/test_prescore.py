@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+from prescore import bm25_scores, prerank, ranking_agreement, tokenize
+
+
+JOB_POST = {
+    "job_title": "Python Backend Developer",
+    "job_description": "Build APIs with Python, FastAPI and MongoDB.",
+    "details": {"requirements": ["Docker", "REST APIs"]},
+    "created_by": "ignored",
+}
+
+
+def profile(name, skills, experience="", projects=None):
+    return {"name": name, "email": f"{name.lower()}@example.com", "skills": skills,
+            "experience": experience, "projects": projects or [], "education": ""}
+
+
+CANDIDATES = [
+    ("c1", profile("Ana", ["JavaScript", "React", "CSS"])),
+    ("c2", profile("Ben", ["Python", "FastAPI", "MongoDB", "Docker"], "3 years building APIs")),
+    ("c3", profile("Cy", ["Python", "Django"])),
+]
+
+
+def test_tokenize_keeps_language_names():
+    assert tokenize("C++, C# and Node.js!") == ["c++", "c#", "and", "node", "js"]
+
+
+def test_bm25_matches_the_textbook_formula():
+    docs = [["python", "python", "docker"], ["java"], ["python", "go", "rust", "java"]]
+
+    scores, terms, tf = bm25_scores(["python"], docs, k1=1.5, b=0.75)
+
+    avg_len = (3 + 1 + 4) / 3
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    expected = [idf * f * 2.5 / (f + 1.5 * (1 - 0.75 + 0.75 * n / avg_len)) for f, n in [(2, 3), (0, 1), (1, 4)]]
+    assert terms == ["python"]
+    assert tf[:, 0].tolist() == [2, 0, 1]
+    assert scores.tolist() == pytest.approx(expected, rel=1e-5)
+
+
+def test_repeated_query_terms_weigh_more():
+    docs = [["python"], ["docker"]]
+
+    scores, _, _ = bm25_scores(["python", "python", "docker"], docs)
+
+    assert scores[0] == pytest.approx(2 * scores[1])
+
+
+def test_prerank_orders_best_match_first_and_explains_it():
+    ranking = prerank(JOB_POST, CANDIDATES)
+
+    assert [entry["_id"] for entry in ranking] == ["c2", "c3", "c1"]
+    assert ranking[0]["score"] == 100.0
+    assert 0 < ranking[1]["score"] < 100
+    assert ranking[2]["score"] == 0.0
+    assert ranking[2]["metrics"] == "No matching terms"
+    assert ranking[0]["metrics"].startswith("Local match on: ")
+    assert "python" in ranking[0]["metrics"]
+    assert ranking[0]["email"] == "ben@example.com"
+
+
+def test_prerank_edge_cases():
+    assert prerank(JOB_POST, []) == []
+
+    # A job post with no text scores everyone 0, in the original order
+    ranking = prerank({"job_title": ""}, CANDIDATES)
+    assert [entry["_id"] for entry in ranking] == ["c1", "c2", "c3"]
+    assert {entry["score"] for entry in ranking} == {0.0}
+
+
+def test_ranking_agreement():
+    reference = [{"_id": c} for c in ["a", "b", "c", "d"]]
+
+    same = ranking_agreement(reference, reference, k=2)
+    assert same == {"compared": 4, "spearman": 1.0, "top_k": 2, "top_k_overlap": 1.0}
+
+    reversed_ = ranking_agreement(reference, list(reversed(reference)), k=2)
+    assert reversed_["spearman"] == -1.0
+    assert reversed_["top_k_overlap"] == 0.0
+
+    # Only candidates ranked by both are compared
+    partial = ranking_agreement(reference, [{"_id": "b"}, {"_id": "a"}, {"_id": "z"}], k=10)
+    assert partial == {"compared": 2, "spearman": -1.0, "top_k": 2, "top_k_overlap": 1.0}
+
+    assert ranking_agreement(reference, [{"_id": "z"}])["compared"] == 0
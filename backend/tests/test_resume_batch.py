@@ -0,0 +1,72 @@
+from resume_batch import split_batch_response
+
+
+RESUMES = [
+    ("Jane Roe\njane@example.com\nPython developer", "Backend role"),
+    ("John Doe\njohn@example.com\nReact developer", "Frontend role"),
+]
+JOB_POST_IDS = {"post-1", "post-2"}
+
+
+def entry(index, jobpost_id, email):
+    return {"resume_index": index, "candidate": {"jobpost_id": jobpost_id, "email": email}}
+
+
+def test_results_are_routed_by_resume_index():
+    response = {"results": [
+        entry(1, "post-2", "john@example.com"),
+        entry(0, "post-1", "Jane@Example.com"),
+    ]}
+
+    results = split_batch_response(response, RESUMES, JOB_POST_IDS)
+
+    assert results[0] == {"candidate": {"jobpost_id": "post-1", "email": "Jane@Example.com"}}
+    assert results[1]["candidate"]["jobpost_id"] == "post-2"
+
+
+def test_an_email_missing_from_the_resume_is_rejected():
+    # The model swapped the two candidates' emails
+    response = {"results": [
+        entry(0, "post-1", "john@example.com"),
+        entry(1, "post-2", "john@example.com"),
+    ]}
+
+    results = split_batch_response(response, RESUMES, JOB_POST_IDS)
+
+    assert results[0] is None
+    assert results[1] == {"candidate": response["results"][1]["candidate"]}
+
+
+def test_a_candidate_without_an_email_is_accepted():
+    response = {"results": [entry(0, "post-1", "")]}
+
+    assert split_batch_response(response, RESUMES, JOB_POST_IDS)[0] is not None
+
+
+def test_unknown_job_posts_and_bad_indexes_are_dropped():
+    response = {"results": [
+        entry(0, "post-9", "jane@example.com"),
+        entry(5, "post-1", "jane@example.com"),
+        entry("x", "post-1", "jane@example.com"),
+        {"resume_index": 1, "candidate": "not a dict"},
+    ]}
+
+    assert split_batch_response(response, RESUMES, JOB_POST_IDS) == [None, None]
+
+
+def test_two_answers_for_one_resume_are_both_distrusted():
+    response = {"results": [
+        entry(0, "post-1", "jane@example.com"),
+        entry(0, "post-2", "jane@example.com"),
+        entry(1, "post-2", "john@example.com"),
+    ]}
+
+    results = split_batch_response(response, RESUMES, JOB_POST_IDS)
+
+    assert results[0] is None
+    assert results[1] is not None
+
+
+def test_a_malformed_response_yields_no_results():
+    assert split_batch_response(None, RESUMES, JOB_POST_IDS) == [None, None]
+    assert split_batch_response({"results": "oops"}, RESUMES, JOB_POST_IDS) == [None, None]
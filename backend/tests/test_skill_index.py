@@ -0,0 +1,24 @@
+from skill_index import extract_skills, normalize_skills
+
+
+def test_common_words_are_not_skills_in_prose():
+    text = "Less than 5 years is fine. Candidates who express interest in rest and travel, and react quickly."
+    assert extract_skills(text) == []
+
+
+def test_capitalized_skill_names_still_match():
+    text = "You will build an Express API with React, style it with Less and expose REST endpoints."
+    assert extract_skills(text) == ["express", "react", "css", "rest_api"]
+
+
+def test_a_capitalized_word_opening_a_sentence_is_not_enough():
+    assert extract_skills("Express your ideas clearly. Spring is our busy season.") == []
+
+
+def test_unambiguous_skills_match_in_any_case():
+    assert extract_skills("python, docker and node.js") == ["python", "docker", "nodejs"]
+
+
+def test_listed_skills_are_normalized_whatever_the_word():
+    # Gemini's skills list is not prose: "less" there is the stylesheet language
+    assert normalize_skills(["less", "Express", "rest"]) == ["css", "express", "rest_api"]
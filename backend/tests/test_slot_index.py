@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from slot_index import InterviewerSlots
+
+
+DAY = datetime(2030, 1, 7)
+
+
+def at(hour, minute=0):
+    return DAY + timedelta(hours=hour, minutes=minute)
+
+
+def slot(slot_id, hour, available=True, minutes=60):
+    return {"_id": slot_id, "start_time": at(hour), "end_time": at(hour) + timedelta(minutes=minutes),
+            "available": available}
+
+
+def make_index():
+    # 09:00-10:00 open, 11:00-12:00 booked, 14:00-15:00 open
+    return InterviewerSlots([slot("s3", 14), slot("s1", 9), slot("s2", 11, available=False)])
+
+
+def test_overlaps_detects_any_intersection():
+    index = make_index()
+
+    assert index.overlaps(at(9, 30), at(10, 30))   # starts inside
+    assert index.overlaps(at(10, 30), at(11, 30))  # ends inside a booked slot
+    assert index.overlaps(at(8), at(16))           # covers several
+    assert index.overlaps(at(14, 15), at(14, 45))  # inside
+
+
+def test_touching_slots_do_not_overlap():
+    index = make_index()
+
+    assert not index.overlaps(at(10), at(11))
+    assert not index.overlaps(at(12), at(14))
+    assert not index.overlaps(at(8), at(9))
+    assert not index.overlaps(at(15), at(16))
+
+
+def test_next_free_skips_booked_slots_and_respects_after():
+    index = make_index()
+
+    assert [slot_id for _, _, slot_id in index.next_free(5, at(0))] == ["s1", "s3"]
+    assert [slot_id for _, _, slot_id in index.next_free(1, at(0))] == ["s1"]
+    # A slot starting exactly at `after` is still offered, one already running is not
+    assert [slot_id for _, _, slot_id in index.next_free(5, at(9))] == ["s1", "s3"]
+    assert [slot_id for _, _, slot_id in index.next_free(5, at(9, 1))] == ["s3"]
+
+
+def test_take_and_give_back_update_the_free_list():
+    index = make_index()
+
+    index.take(at(9))
+    assert [slot_id for _, _, slot_id in index.next_free(5, at(0))] == ["s3"]
+    assert index.overlaps(at(9), at(10))  # still a slot, only no longer free
+
+    index.give_back(at(9), at(10), "s1")
+    index.give_back(at(9), at(10), "s1")  # twice is a no-op
+    assert [slot_id for _, _, slot_id in index.next_free(5, at(0))] == ["s1", "s3"]
+
+
+def test_add_keeps_the_lists_sorted():
+    index = make_index()
+
+    index.add(at(12), at(13), "s4")
+
+    assert [start for start, _ in index.slots] == [at(9), at(11), at(12), at(14)]
+    assert [slot_id for _, _, slot_id in index.next_free(5, at(0))] == ["s1", "s4", "s3"]
+
+
+def test_prune_drops_ended_slots_but_keeps_running_ones():
+    index = make_index()
+
+    index.prune(at(11, 30))
+
+    # 09:00 has ended; 11:00 is still running; 14:00 is ahead
+    assert [start for start, _ in index.slots] == [at(11), at(14)]
+    assert [slot_id for _, _, slot_id in index.free] == ["s3"]
+    assert index.overlaps(at(11, 30), at(11, 45))
+
+
+def test_prune_everything():
+    index = make_index()
+
+    index.prune(at(20))
+
+    assert index.slots == []
+    assert index.free == []
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+import slot_schedule
+from slot_schedule import expand_recurrence, slot_json, to_utc
+
+
+def test_weekday_rule_expands_back_to_back_slots():
+    slots = expand_recurrence("2025-04-11", "2025-04-14", ["fri", "Monday"], "10:00", "12:00", 60)
+
+    # Saturday and Sunday are skipped
+    assert slots == [
+        (datetime(2025, 4, 11, 10), datetime(2025, 4, 11, 11)),
+        (datetime(2025, 4, 11, 11), datetime(2025, 4, 11, 12)),
+        (datetime(2025, 4, 14, 10), datetime(2025, 4, 14, 11)),
+        (datetime(2025, 4, 14, 11), datetime(2025, 4, 14, 12)),
+    ]
+
+
+def test_gap_and_a_slot_that_would_run_past_day_end():
+    slots = expand_recurrence("2025-04-07", "2025-04-07", ["mon"], "10:00", "12:00", 45, gap=15)
+
+    assert [start.time().isoformat() for start, _ in slots] == ["10:00:00", "11:00:00"]
+    assert slots[-1][1] == datetime(2025, 4, 7, 11, 45)
+
+
+def test_local_times_keep_their_wall_clock_across_the_dst_change():
+    # New York springs forward on Sunday 2025-03-09: EST (UTC-5) -> EDT (UTC-4)
+    slots = expand_recurrence("2025-03-07", "2025-03-10", ["fri", "mon"], "09:00", "10:00", 60,
+                              tz="America/New_York")
+
+    assert slots == [
+        (datetime(2025, 3, 7, 14), datetime(2025, 3, 7, 15)),
+        (datetime(2025, 3, 10, 13), datetime(2025, 3, 10, 14)),
+    ]
+
+
+def test_fall_back_in_london():
+    # London falls back on Sunday 2025-10-26: BST (UTC+1) -> GMT
+    slots = expand_recurrence("2025-10-24", "2025-10-27", ["fri", "mon"], "09:00", "09:30", 30,
+                              tz="Europe/London")
+
+    assert [start for start, _ in slots] == [datetime(2025, 10, 24, 8), datetime(2025, 10, 27, 9)]
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"tz": "Mars/Olympus_Mons"}, "Unknown timezone"),
+    ({"weekdays": ["funday"]}, "Unknown weekdays"),
+    ({"end_date": "2025-04-01"}, "before start_date"),
+    ({"day_end": "09:00"}, "day_end"),
+    ({"duration": 0}, "duration"),
+    ({"gap": -5}, "gap"),
+])
+def test_invalid_rules_are_rejected(kwargs, message):
+    rule = {"start_date": "2025-04-07", "end_date": "2025-04-11", "weekdays": ["mon"],
+            "day_start": "10:00", "day_end": "12:00", "duration": 60, **kwargs}
+
+    with pytest.raises(ValueError, match=message):
+        expand_recurrence(**rule)
+
+
+def test_rules_yielding_too_many_slots_are_rejected(monkeypatch):
+    monkeypatch.setattr(slot_schedule, "MAX_SLOTS_PER_REQUEST", 3)
+
+    with pytest.raises(ValueError, match="more than 3 slots"):
+        expand_recurrence("2025-04-07", "2025-04-07", ["mon"], "10:00", "14:00", 60)
+
+
+def test_to_utc_and_slot_json_round_trip():
+    assert to_utc("2025-04-10T10:00:00Z") == datetime(2025, 4, 10, 10)
+    assert to_utc("2025-04-10T12:00:00+02:00") == datetime(2025, 4, 10, 10)
+    assert to_utc("2025-04-10T10:00:00") == datetime(2025, 4, 10, 10)  # no offset: UTC
+    assert slot_json(datetime(2025, 4, 10, 10)) == "2025-04-10T10:00:00Z"
+    assert to_utc(slot_json(datetime(2025, 4, 10, 10))) == datetime(2025, 4, 10, 10)
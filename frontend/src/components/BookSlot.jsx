@@ -28,6 +28,18 @@ const NoSymbolIcon = () => ( // For no slots
 );
 
 
+// The slot list is paginated: follow next_cursor until the last page
+const fetchAllSlots = async (userId) => {
+  const slots = [];
+  let after = null;
+  do {
+    const response = await axios.get(`http://localhost:8000/users/${userId}/available-slots/`, { params: { after } });
+    slots.push(...(response.data.slots || []));
+    after = response.data.next_cursor;
+  } while (after);
+  return slots;
+};
+
 const BookSlot = () => {
   const { userId } = useParams();
   const [availableSlots, setAvailableSlots] = useState([]);
@@ -52,8 +64,7 @@ const BookSlot = () => {
       }
 
       try {
-        const response = await axios.get(`http://localhost:8000/users/${userId}/available-slots/`);
-        const allSlots = response.data.slots || [];
+        const allSlots = await fetchAllSlots(userId);
         const available = allSlots.filter(slot => slot.available).sort((a, b) => new Date(a.start_time) - new Date(b.start_time));
         const booked = allSlots.filter(slot => !slot.available).sort((a, b) => new Date(a.start_time) - new Date(b.start_time));
 
@@ -108,8 +119,7 @@ const BookSlot = () => {
       setMessage({ text: errorMsg, type: "error" });
        // Optionally re-fetch slots if booking failed due to slot being taken
       if (error.response?.status === 409 || error.response?.data?.detail?.includes("taken")) {
-         const newResponse = await axios.get(`http://localhost:8000/users/${userId}/available-slots/`);
-         const allSlots = newResponse.data.slots || [];
+         const allSlots = await fetchAllSlots(userId);
          setAvailableSlots(allSlots.filter(slot => slot.available).sort((a, b) => new Date(a.start_time) - new Date(b.start_time)));
          setBookedSlots(allSlots.filter(slot => !slot.available).sort((a, b) => new Date(a.start_time) - new Date(b.start_time)));
       }
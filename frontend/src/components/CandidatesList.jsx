@@ -50,14 +50,20 @@ const CandidatesList = () => {
       setLoading(true);
       setError(null);
       try {
-        // Using your original endpoint: "get-canidates"
-        const response = await axios.get(`http://localhost:8000/get-canidates/${userId}/${job_post_id}`);
-        
-        // Log the entire response.data to check its structure in your console
-        console.log("Full API response data:", response.data); 
+        // Using your original endpoint: "get-canidates", paginated: follow next_cursor until the last page
+        const allCandidates = [];
+        let after = null;
+        do {
+          const response = await axios.get(`http://localhost:8000/get-canidates/${userId}/${job_post_id}`, { params: { after } });
+
+          // Log the entire response.data to check its structure in your console
+          console.log("Full API response data:", response.data);
 
-        // Ensure response.data.candidates is an array, fallback to empty array if not
-        setCandidates(Array.isArray(response.data.candidates) ? response.data.candidates : []);
+          // Ensure response.data.candidates is an array, fallback to empty array if not
+          allCandidates.push(...(Array.isArray(response.data.candidates) ? response.data.candidates : []));
+          after = response.data.next_cursor;
+        } while (after);
+        setCandidates(allCandidates);
         
         // Optional: Fetch job post details to get the title
         // const jobResponse = await axios.get(`http://localhost:8000/get-single_post/${userId}/${job_post_id}`);
@@ -109,6 +109,26 @@ const GetSingleJobPost = () => {
     }
   }, [userId, post_id]);
 
+  // Follow the background generation of a new post and reload it once done
+  const generationStatus = jobPost?.generation_status;
+  useEffect(() => {
+    if (generationStatus !== "pending" && generationStatus !== "generating") return;
+
+    const source = new EventSource(`http://localhost:8000/jobpost-status/${userId}/${post_id}/stream`);
+    source.onmessage = async (event) => {
+      const status = JSON.parse(event.data);
+      if (status.generation_status === "ready") {
+        source.close();
+        const response = await axios.get(`http://localhost:8000/get-single_post/${userId}/${post_id}`);
+        setJobPost(response.data.job_post);
+      } else {
+        setJobPost((post) => ({ ...post, generation_status: status.generation_status, generation_error: status.generation_error }));
+      }
+    };
+    source.onerror = () => source.close();
+    return () => source.close();
+  }, [userId, post_id, generationStatus]);
+
   if (loading) {
     return (
       <div className="flex items-center justify-center min-h-screen bg-slate-100">
@@ -184,6 +204,12 @@ const GetSingleJobPost = () => {
                 Posted on: {new Date(jobPost.createdAt || Date.now()).toLocaleDateString()}
                 {jobPost.user?.username && ` by ${jobPost.user.username}`}
             </p>
+            {(jobPost.generation_status === "pending" || jobPost.generation_status === "generating") && (
+                <p className="mt-2 text-sm text-indigo-600">Generating the job post content with AI...</p>
+            )}
+            {jobPost.generation_status === "failed" && (
+                <p className="mt-2 text-sm text-red-600">Generating the job post content failed: {jobPost.generation_error}</p>
+            )}
         </div>
 
         <SectionCard title="Job Details">
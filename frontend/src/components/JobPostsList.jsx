@@ -47,8 +47,15 @@ const JobPostsList = () => {
       setLoading(true);
       setError(null);
       try {
-        const response = await axios.get(`http://localhost:8000/get-posts/${userId}`);
-        setJobPosts(response.data.job_posts || []); // Ensure job_posts is an array
+        // The list is paginated: follow next_cursor until the last page
+        const posts = [];
+        let after = null;
+        do {
+          const response = await axios.get(`http://localhost:8000/get-posts/${userId}`, { params: { after } });
+          posts.push(...(response.data.job_posts || [])); // Ensure job_posts is an array
+          after = response.data.next_cursor;
+        } while (after);
+        setJobPosts(posts);
       } catch (err) {
         console.error("Error fetching job posts:", err.response?.data || err.message);
         setError(err.response?.data?.detail || "Failed to fetch job posts. Please try again.");